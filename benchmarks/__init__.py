@@ -0,0 +1 @@
+# Benchmark suite for hide/extract throughput and peak memory
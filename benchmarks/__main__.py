@@ -0,0 +1,32 @@
+import sys
+import click
+from .suite import (PROFILES, DEFAULT_THRESHOLD, run_suite, save_results,
+                    load_results, compare)
+
+
+@click.command()
+@click.option('--profile', type=click.Choice(sorted(PROFILES)), default='quick',
+              show_default=True, help='Cover and payload sizes to sweep')
+@click.option('--output', '-o', default='bench_results.json', show_default=True,
+              help='Where to write the JSON results')
+@click.option('--baseline', '-b', help='Saved results to compare against')
+@click.option('--threshold', '-t', type=float, default=DEFAULT_THRESHOLD, show_default=True,
+              help='Allowed slowdown or memory growth before flagging (0.25 = 25%)')
+def main(profile, output, baseline, threshold):
+    """Benchmark GhostVault hide/extract throughput and peak memory."""
+    document = run_suite(profile, log=lambda name: click.echo(f"  {name}", err=True))
+    save_results(document, output)
+    click.echo(f"Wrote {len(document['results'])} results to {output}")
+
+    if baseline:
+        regressions = compare(document, load_results(baseline), threshold)
+        for item in regressions:
+            click.echo(f"REGRESSION {item['name']} {item['metric']}: "
+                       f"{item['baseline']:.6g} -> {item['current']:.6g} ({item['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        click.echo("No regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
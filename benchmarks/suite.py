@@ -0,0 +1,277 @@
+import json
+import os
+import platform
+import random
+import string
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+import zlib
+import numpy as np
+from steg.image_steg import hide_in_image, extract_from_image
+from steg.audio_steg import hide_in_audio, extract_from_audio
+from utils.validator import check_capacity
+
+# Cover sizes, payload sizes and passwords swept by each profile.
+# Image sizes are megapixels, audio sizes are seconds at 44.1 kHz.
+PROFILES = {
+    'quick': {
+        'image_mp': [0.1, 1],
+        'image_modes': ['RGB', 'RGBA', 'L'],
+        'audio_seconds': [1, 10],
+        'audio_channels': [1, 2],
+        'payload_bytes': [64, 4096],
+        'passwords': [None, 'benchmark'],
+        'repeat': 3,
+    },
+    'full': {
+        'image_mp': [0.1, 1, 10, 100],
+        'image_modes': ['RGB', 'RGBA', 'L'],
+        'audio_seconds': [1, 60, 600, 3600],
+        'audio_channels': [1, 2],
+        'payload_bytes': [64, 4096, 262144],
+        'passwords': [None, 'benchmark'],
+        'repeat': 3,
+    },
+}
+
+SAMPLE_RATE = 44100
+DEFAULT_THRESHOLD = 0.25
+
+# Differences below these are timer and allocator noise, never regressions
+NOISE_FLOOR = {'seconds': 0.001, 'peak_bytes': 64 * 1024}
+
+# Rows or frames generated per step so large covers never sit in memory whole
+_GENERATE_BLOCK = 1 << 16
+
+# PNG colour types of the image modes the profiles sweep
+_PNG_COLOR_TYPES = {'L': 0, 'RGB': 2, 'RGBA': 6}
+
+# The CLI timed from a fresh interpreter by the startup benchmarks
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ghostvault_cli.py')
+
+
+def _png_chunk(f, kind, data):
+    f.write(struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+def make_image(path, megapixels, mode, seed=0):
+    """Write a square random PNG cover of about `megapixels` megapixels.
+
+    Rows are generated and compressed a block at a time straight into the
+    PNG stream, so not even a 100 MP cover is held in memory.
+    """
+    side = max(1, int((megapixels * 1e6) ** 0.5))
+    bands = len(mode)
+    rng = np.random.default_rng(seed)
+    compressor = zlib.compressobj(1)
+    rows = max(1, _GENERATE_BLOCK * 16 // (side * bands))
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        _png_chunk(f, b'IHDR', struct.pack('>IIBBBBB', side, side, 8, _PNG_COLOR_TYPES[mode], 0, 0, 0))
+        for start in range(0, side, rows):
+            block = rng.integers(0, 256, (min(rows, side - start), side * bands + 1), dtype=np.uint8)
+            # Filter type 0 in front of every row
+            block[:, 0] = 0
+            _png_chunk(f, b'IDAT', compressor.compress(block.tobytes()))
+        _png_chunk(f, b'IDAT', compressor.flush())
+        _png_chunk(f, b'IEND', b'')
+    return side * side * bands
+
+
+def make_audio(path, seconds, channels, seed=0):
+    """Write a random 16-bit WAV cover of `seconds` seconds."""
+    rng = np.random.default_rng(seed)
+    frames = int(seconds * SAMPLE_RATE)
+    with wave.open(path, 'wb') as audio:
+        audio.setnchannels(channels)
+        audio.setsampwidth(2)
+        audio.setframerate(SAMPLE_RATE)
+        for start in range(0, frames, _GENERATE_BLOCK):
+            count = min(_GENERATE_BLOCK, frames - start) * channels
+            audio.writeframes(rng.integers(-32768, 32767, count, dtype=np.int16).tobytes())
+    return frames * channels
+
+
+def make_message(size, seed=0):
+    """Random printable text of `size` bytes."""
+    rng = random.Random(seed)
+    return ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(size))
+
+
+def measure(func, repeat):
+    """Best wall time over `repeat` runs, plus the tracemalloc peak of one run."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def _record(results, name, op, samples, func, repeat):
+    seconds, peak = measure(func, repeat)
+    results.append({
+        'name': name,
+        'op': op,
+        'samples': samples,
+        'seconds': seconds,
+        'samples_per_sec': samples / seconds if seconds else None,
+        'peak_bytes': peak,
+    })
+
+
+def _run_cli(expected, *args):
+    """Run the CLI in a new interpreter, raising unless its output contains `expected`.
+
+    The CLI reports errors on stdout and still exits with status 0, so the
+    exit status alone proves nothing.
+    """
+    run = subprocess.run([sys.executable, CLI, *args], capture_output=True, text=True)
+    if run.returncode or expected not in run.stdout:
+        raise RuntimeError(f"CLI {' '.join(args)} failed: {(run.stdout + run.stderr).strip()}")
+
+
+def _record_startup(results, name, op, samples, args, repeat, expected):
+    # Memory of the child interpreter is not traced, so peak_bytes stays 0
+    seconds = measure(lambda: _run_cli(expected, *args), repeat)[0]
+    results.append({
+        'name': name,
+        'op': op,
+        'samples': samples,
+        'seconds': seconds,
+        'samples_per_sec': None,
+        'peak_bytes': 0,
+    })
+
+
+def _startup(results, workdir, repeat):
+    """Time cold starts of `--help`, hide and extract on tiny covers.
+
+    Short jobs are dominated by interpreter start-up and imports rather
+    than by embedding, and these runs measure exactly that.
+    """
+    _record_startup(results, 'startup/help', 'startup_help', 0, ['--help'], repeat, 'Usage:')
+    for kind, ext, make, params in [('image', '.png', make_image, (0.01, 'RGB')),
+                                    ('audio', '.wav', make_audio, (0.1, 1))]:
+        cover = os.path.join(workdir, f'startup{ext}')
+        target = os.path.join(workdir, f'startup_output{ext}')
+        samples = make(cover, *params)
+        _record_startup(results, f'startup/hide/{kind}', 'startup_hide', samples,
+                        ['hide', '-f', cover, '-m', 'startup', '-o', target], repeat,
+                        'successfully hidden')
+        _record_startup(results, f'startup/extract/{kind}', 'startup_extract', samples,
+                        ['extract', '-f', target], repeat, 'Extracted message: startup')
+
+
+def _cases(config, workdir):
+    """Yield (label, kind, cover path, sample count) for every synthetic cover."""
+    for mp in config['image_mp']:
+        for mode in config['image_modes']:
+            path = os.path.join(workdir, f'cover_{mp}mp_{mode}.png')
+            samples = make_image(path, mp, mode)
+            yield f'{mp}MP/{mode}', 'image', path, samples
+            os.remove(path)
+    for seconds in config['audio_seconds']:
+        for channels in config['audio_channels']:
+            path = os.path.join(workdir, f'cover_{seconds}s_{channels}ch.wav')
+            samples = make_audio(path, seconds, channels)
+            yield f'{seconds}s/{channels}ch', 'audio', path, samples
+            os.remove(path)
+
+
+def run_suite(profile='quick', log=None):
+    """Run a benchmark profile and return its results document."""
+    config = PROFILES[profile]
+    repeat = config['repeat']
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix='ghostvault-bench-') as workdir:
+        if log:
+            log('startup')
+        _startup(results, workdir, repeat)
+
+        output = {'image': os.path.join(workdir, 'output.png'),
+                  'audio': os.path.join(workdir, 'output.wav')}
+        for label, kind, cover, samples in _cases(config, workdir):
+            hide = hide_in_image if kind == 'image' else hide_in_audio
+            extract = extract_from_image if kind == 'image' else extract_from_audio
+
+            for size in config['payload_bytes']:
+                message = make_message(size)
+                for password in config['passwords']:
+                    name = f"{kind}/{label}/{size}B/{'password' if password else 'plain'}"
+                    if log:
+                        log(name)
+
+                    _record(results, f'check_capacity/{name}', 'check_capacity', samples,
+                            lambda: check_capacity(cover, message, password), repeat)
+                    if not check_capacity(cover, message, password):
+                        continue
+
+                    target = output[kind]
+                    _record(results, f'hide/{name}', f'hide_in_{kind}', samples,
+                            lambda: hide(cover, message, target, password), repeat)
+                    # A broken extractor returning None early must not pass for a speedup
+                    if extract(target, password) != message:
+                        raise AssertionError(f"{name}: extraction did not return the hidden message")
+                    _record(results, f'extract/{name}', f'extract_from_{kind}', samples,
+                            lambda: extract(target, password), repeat)
+
+    return {
+        'profile': profile,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def save_results(document, path):
+    """Write a results document as JSON."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+
+
+def load_results(path):
+    """Read a results document written by save_results."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """List the benchmarks that got slower or hungrier than the baseline.
+
+    A benchmark regresses when its time or peak memory exceeds the baseline
+    value by more than `threshold` (0.25 is 25%) and by more than the noise
+    floor. Benchmarks missing from either document are ignored.
+    """
+    previous = {entry['name']: entry for entry in baseline['results']}
+    regressions = []
+    for entry in current['results']:
+        old = previous.get(entry['name'])
+        if not old:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            limit = max(old[metric] * (1 + threshold), old[metric] + NOISE_FLOOR[metric])
+            if old[metric] and entry[metric] > limit:
+                regressions.append({
+                    'name': entry['name'],
+                    'metric': metric,
+                    'baseline': old[metric],
+                    'current': entry[metric],
+                    'ratio': entry[metric] / old[metric],
+                })
+    return regressions
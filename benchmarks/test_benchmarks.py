@@ -0,0 +1,32 @@
+"""Run the quick benchmark profile under pytest.
+
+Set GHOSTVAULT_BENCH_BASELINE to a saved results file to fail on
+regressions against it.
+"""
+
+import os
+from .suite import PROFILES, DEFAULT_THRESHOLD, run_suite, load_results, compare
+
+
+def test_quick_profile():
+    document = run_suite('quick')
+    assert document['results']
+
+    config = PROFILES['quick']
+    ops = {entry['op'] for entry in document['results']}
+    assert {'hide_in_image', 'extract_from_image', 'hide_in_audio',
+            'extract_from_audio', 'check_capacity', 'startup_help', 'startup_hide',
+            'startup_extract'} <= ops
+    assert all(entry['seconds'] >= 0 and entry['peak_bytes'] >= 0
+               for entry in document['results'])
+    startup = [entry for entry in document['results'] if entry['op'].startswith('startup_')]
+    assert len(startup) == 5
+    assert len(document['results']) - len(startup) <= 3 * (
+        len(config['image_mp']) * len(config['image_modes'])
+        + len(config['audio_seconds']) * len(config['audio_channels'])
+    ) * len(config['payload_bytes']) * len(config['passwords'])
+
+    baseline = os.environ.get('GHOSTVAULT_BENCH_BASELINE')
+    if baseline:
+        threshold = float(os.environ.get('GHOSTVAULT_BENCH_THRESHOLD', DEFAULT_THRESHOLD))
+        assert compare(document, load_results(baseline), threshold) == []
@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
 import os
 import sys
-from steg.image_steg import hide_in_image, extract_from_image
-from steg.audio_steg import hide_in_audio, extract_from_audio
-from utils.validator import validate_file, check_capacity
+
+# The steg and utils modules are imported by the menus that use them, so
+# the main menu comes up without loading PIL, NumPy or cryptography
 
 def print_logo():
     """Display GhostVault logo with colors."""
@@ -22,34 +22,6 @@ def print_logo():
 """
     print(logo)
 
-def scan_file(file_path):
-    """Scan file to detect if it contains hidden data."""
-    try:
-        ext = os.path.splitext(file_path)[1].lower()
-        
-        if ext in ['.png', '.jpg', '.jpeg']:
-            message = extract_from_image(file_path)
-        elif ext == '.wav':
-            message = extract_from_audio(file_path)
-        else:
-            return None, None
-        
-        if message:
-            # Try to detect if it's encrypted - check for base64 pattern
-            try:
-                import base64
-                # Try to decode as base64 - if successful and contains binary data, likely encrypted
-                decoded = base64.b64decode(message)
-                is_encrypted = len(decoded) > 16 and len(message) > 20
-            except:
-                # Check for non-printable characters or base64-like patterns
-                is_encrypted = any(ord(c) > 127 or (ord(c) < 32 and c not in '\n\r\t') for c in message[:50])
-            
-            return "text", is_encrypted
-        return None, None
-    except:
-        return None, None
-
 def convert_audio(file_path):
     """Convert MP3 to WAV format."""
     try:
@@ -81,6 +53,10 @@ def convert_audio(file_path):
 
 def hide_menu():
     """Handle hide operations."""
+    from steg.backends import lossless_output
+    from steg.vault import Vault
+    from utils.validator import validate_file, check_capacity
+    
     print("\n\033[92m=== HIDE MESSAGE ===\033[0m")
     print("1. Hide in Image")
     print("2. Hide in Audio")
@@ -120,26 +96,23 @@ def hide_menu():
     
     message = input("Enter secret message: ").strip()
     
-    if not check_capacity(file_path, message):
-        print("\033[91mError: Message too long for the cover file!\033[0m")
-        return
-    
     output_name = input("Enter output filename (without extension): ").strip()
     
-    # Get the same extension as input file
+    # Get the same extension as input file, or PNG for lossy JPEG covers
     input_ext = os.path.splitext(file_path)[1]
-    output_path = os.path.join(os.path.dirname(file_path), output_name + input_ext)
+    output_path = lossless_output(os.path.join(os.path.dirname(file_path), output_name + input_ext))
     
     use_password = input("Use password protection? (y/n) - y=YES & n=NO : ").strip().lower()
     password = None
     if use_password == 'y':
         password = input("Enter password: ").strip()
     
+    if not check_capacity(file_path, message, password):
+        print("\033[91mError: Message too long for the cover file!\033[0m")
+        return
+    
     try:
-        if choice == '1':
-            hide_in_image(file_path, message, output_path, password)
-        else:
-            hide_in_audio(file_path, message, output_path, password)
+        Vault(password).hide(file_path, message, out=output_path)
         
         print(f"\033[92mMessage successfully hidden in {output_path}\033[0m")
     except Exception as e:
@@ -147,6 +120,9 @@ def hide_menu():
 
 def reveal_menu():
     """Handle reveal operations."""
+    from steg.cover import OpenedCover
+    from utils.validator import validate_file
+    
     print("\n\033[93m=== REVEAL MESSAGE ===\033[0m")
     
     # Create extracted_messages folder if it doesn't exist
@@ -160,16 +136,24 @@ def reveal_menu():
         return
     
     print("\n\033[96mScanning file...\033[0m")
-    content_type, is_encrypted = scan_file(file_path)
-    
-    if not content_type:
-        print("\033[91mNo hidden message found in this file.\033[0m")
+    try:
+        # Decode the cover once; detection and extraction reuse the payload
+        cover = OpenedCover(file_path)
+    except Exception as e:
+        print(f"\033[91mError: {str(e)}\033[0m")
         return
     
-    print(f"\033[92mHidden content detected: {content_type.upper()}\033[0m")
-    
     password = None
-    if is_encrypted:
+    if not cover.found:
+        # Scattered payloads only show up under their password
+        password = input("Nothing found in order. Password for a scattered message (or press Enter to stop): ").strip()
+        if not password or cover.reveal(password) is None:
+            print("\033[91mNo hidden message found in this file.\033[0m")
+            return
+    
+    print("\033[92mHidden content detected: TEXT\033[0m")
+    
+    if cover.is_encrypted and not password:
         print("\033[93mContent appears to be encrypted.\033[0m")
         password = input("Enter password (or press Enter to try without): ").strip()
         password = password if password else None
@@ -182,21 +166,12 @@ def reveal_menu():
         return
     
     try:
-        ext = os.path.splitext(file_path)[1].lower()
-        
-        # First extract raw message without decryption
-        if ext in ['.png', '.jpg', '.jpeg']:
-            raw_message = extract_from_image(file_path)
-            if password:
-                decrypted_message = extract_from_image(file_path, password)
-            else:
-                decrypted_message = raw_message
-        elif ext == '.wav':
-            raw_message = extract_from_audio(file_path)
-            if password:
-                decrypted_message = extract_from_audio(file_path, password)
-            else:
-                decrypted_message = raw_message
+        # Raw message first, then the decrypted one from the same payload
+        raw_message = cover.raw_message
+        if password:
+            decrypted_message = cover.reveal(password)
+        else:
+            decrypted_message = raw_message
         
         if raw_message:
             # Show encrypted message first if password was used
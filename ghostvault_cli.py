@@ -6,41 +6,113 @@ GitHub: https://github.com/ACT91
 """
 
 import click
+import json
 import os
-from steg.image_steg import hide_in_image, extract_from_image
-from steg.audio_steg import hide_in_audio, extract_from_audio
-from utils.validator import validate_file, check_capacity
+from steg.compression import MAX_MESSAGE_SIZE
+from steg.profiling import recording, capture
+
+# Commands import the steg and utils modules they need when they run, so
+# --help and the other commands never load PIL, NumPy or cryptography
+# for a job that does not touch them
 
 @click.group()
-def cli():
+@click.option('--profile', type=click.Choice(['text', 'json']),
+              help='Print a per-stage timing breakdown to stderr when the command ends')
+@click.option('--profile-with', type=click.Choice(['cprofile', 'pyinstrument']),
+              help='Also run the command under a function-level profiler')
+@click.option('--profile-out', help='File for the --profile-with report (default: stderr/stdout)')
+@click.pass_context
+def cli(ctx, profile, profile_with, profile_out):
     """GhostVault - Text-based steganography tool by ACT91"""
-    pass
+    if profile_with:
+        try:
+            ctx.with_resource(capture(profile_with, profile_out))
+        except ValueError as e:
+            click.echo(f"Error: {str(e)}")
+            ctx.exit(1)
+    if profile:
+        recorder = ctx.with_resource(recording())
+        
+        def print_profile():
+            if profile == 'json':
+                click.echo(recorder.to_json(), err=True)
+            else:
+                click.echo(recorder.report(), err=True)
+        
+        ctx.call_on_close(print_profile)
+
+def _channel_list(ctx, param, value):
+    """Parse a comma-separated list of channel numbers."""
+    if value is None:
+        return None
+    try:
+        return [int(channel) for channel in value.split(',')]
+    except ValueError:
+        raise click.BadParameter("use channel numbers such as 0 or 0,1")
 
 @cli.command()
-@click.option('--file', '-f', required=True, help='Input file path')
+@click.option('--file', '-f', help='Input file path')
 @click.option('--message', '-m', required=True, help='Secret message to hide')
 @click.option('--output', '-o', required=True, help='Output file path')
 @click.option('--password', '-p', help='Password for encryption (optional)')
-def hide(file, message, output, password):
+@click.option('--inplace', is_flag=True, help='WAV only: copy the cover and patch just the touched samples')
+@click.option('--bits-per-sample', '-b', type=click.IntRange(1, 8), default=1,
+              help='Low bits used per sample: 1-4 for images, 1-8 for audio')
+@click.option('--scatter', is_flag=True, help='Spread the payload in an order keyed by the password')
+@click.option('--index', 'index_db', help='Pick the smallest fitting cover from this cover index instead of --file')
+@click.option('--encoder', type=click.Choice(['fast', 'balanced', 'small']), default='balanced',
+              show_default=True, help='Image encoder profile: speed against file size')
+@click.option('--verify', is_flag=True, help='Read the payload back from the written image')
+@click.option('--channels', callback=_channel_list,
+              help='WAV only: comma-separated channels to embed in, from 0 (default: all)')
+@click.option('--matrix', type=click.IntRange(2, 8),
+              help='Hamming matrix embedding: P bits per block of 2^P-1 samples, at most one changed')
+def hide(file, message, output, password, inplace, bits_per_sample, scatter, index_db, encoder, verify,
+         channels, matrix):
     """Hide a secret message in an image or audio file."""
+    from steg.backends import backend_for, lossless_output
+    from steg.vault import Vault
+    from utils.validator import validate_file, check_capacity
+    
     try:
+        if not file and not index_db:
+            click.echo("Error: Give a cover with --file or a cover index with --index")
+            return
+        
+        if not file:
+            from steg.payload import HEADER_BITS, HEADER_SIZE, payload_size, samples_needed
+            from utils.cover_index import CoverIndex
+            
+            # The output extension decides whether an image or a WAV cover is wanted
+            media = backend_for(output).media
+            size = payload_size(message, password)
+            if matrix:
+                # The index records plain depths; ask for the samples the code needs
+                size = HEADER_SIZE + -(-(samples_needed(size, 1, matrix) - HEADER_BITS) // 8)
+            with CoverIndex(index_db) as index:
+                file = index.best_fit(size, bits_per_sample, media)
+            if not file:
+                click.echo("Error: No indexed cover is large enough for the message")
+                return
+            click.echo(f"Using cover {file}")
+        
         if not validate_file(file):
             click.echo(f"Error: Invalid or unsupported file: {file}")
             return
         
-        if not check_capacity(file, message):
+        if not check_capacity(file, message, password, bits_per_sample, channels, matrix or 0):
             click.echo("Error: Message too long for the cover file")
             return
         
-        file_ext = os.path.splitext(file)[1].lower()
+        # JPEG re-encoding would wipe the LSBs, so such outputs become PNG
+        lossless = lossless_output(output)
+        if lossless != output:
+            click.echo(f"Note: {os.path.splitext(output)[1]} output is lossy; writing {lossless} instead")
+            output = lossless
         
-        if file_ext in ['.png', '.jpg', '.jpeg']:
-            hide_in_image(file, message, output, password)
-        elif file_ext in ['.wav']:
-            hide_in_audio(file, message, output, password)
-        else:
-            click.echo(f"Error: Unsupported file format: {file_ext}")
-            return
+        vault = Vault(password, bits_per_sample, scatter=scatter, encoder=encoder, verify=verify,
+                      channels=channels, matrix=matrix or 0)
+        vault.hide(file, message, out=output, inplace=inplace)
         
         click.echo(f"Message successfully hidden in {output}")
         
@@ -48,27 +120,44 @@ def hide(file, message, output, password):
         click.echo(f"Error: {str(e)}")
 
 @cli.command()
-@click.option('--file', '-f', required=True, help='File to extract message from')
+@click.option('--file', '-f', help='File to extract message from')
 @click.option('--password', '-p', help='Password for decryption (optional)')
-@click.option('--output', '-o', help='Save extracted message to file (optional)')
-def extract(file, password, output):
+@click.option('--output', '-o', help='Save extracted message to file (required with --set)')
+@click.option('--max-size', type=int, default=MAX_MESSAGE_SIZE, show_default=True,
+              help='Largest decompressed message (or shard) accepted, in bytes')
+@click.option('--set', 'shard_sources', multiple=True,
+              help='Reassemble a split payload from the covers in this file or directory (repeatable)')
+@click.option('--set-id', help='With --set, only use shards of this set (hex id)')
+@click.option('--workers', '-w', type=int, help='Worker processes for --set (default: CPU count)')
+@click.option('--channels', callback=_channel_list,
+              help='WAV only: the channels given to hide --channels (default: all)')
+def extract(file, password, output, max_size, shard_sources, set_id, workers, channels):
     """Extract a hidden message from an image or audio file."""
+    from steg.vault import Vault
+    from utils.validator import validate_file
+    
     try:
-        if not validate_file(file):
-            click.echo(f"Error: Invalid or unsupported file: {file}")
+        if shard_sources:
+            from utils.scanner import iter_covers
+            from utils.sharding import join_shards
+            
+            if not output:
+                click.echo("Error: --output is required with --set")
+                return
+            
+            covers = list(iter_covers(shard_sources))
+            summary = join_shards(covers, output, password, workers, max_size,
+                                  bytes.fromhex(set_id) if set_id else None)
+            click.echo(f"Reassembled {summary['bytes']} bytes from {summary['shards']} shards "
+                       f"of set {summary['set_id']} into {output}")
             return
         
-        file_ext = os.path.splitext(file)[1].lower()
-        message = None
-        
-        if file_ext in ['.png', '.jpg', '.jpeg']:
-            message = extract_from_image(file, password)
-        elif file_ext in ['.wav']:
-            message = extract_from_audio(file, password)
-        else:
-            click.echo(f"Error: Unsupported file format: {file_ext}")
+        if not file or not validate_file(file):
+            click.echo(f"Error: Invalid or unsupported file: {file}")
             return
         
+        message = Vault(password, max_size=max_size, channels=channels).extract(file)
+        
         if message:
             if output:
                 with open(output, 'w', encoding='utf-8') as f:
@@ -82,5 +171,199 @@ def extract(file, password, output):
     except Exception as e:
         click.echo(f"Error: {str(e)}")
 
+@cli.command()
+@click.argument('file')
+@click.option('--channels', callback=_channel_list,
+              help='WAV only: comma-separated channels to count, from 0 (default: all)')
+def capacity(file, channels):
+    """Show how many payload bytes a cover holds in each embedding mode."""
+    from steg.backends import backend_for
+    from steg.payload import HEADER_SIZE, MAX_MATRIX
+    from utils.validator import validate_file, cover_capacity
+    
+    try:
+        if not validate_file(file):
+            click.echo(f"Error: Invalid or unsupported file: {file}")
+            return
+        
+        # Payload sizes count the compressed, encrypted message, not the header
+        for depth in range(1, backend_for(file).max_depth + 1):
+            size = max(0, cover_capacity(file, depth, channels) - HEADER_SIZE)
+            click.echo(f"{depth} bit{'s' if depth > 1 else ''} per sample: {size} bytes")
+        for matrix in range(2, MAX_MATRIX + 1):
+            size = max(0, cover_capacity(file, 1, channels, matrix) - HEADER_SIZE)
+            click.echo(f"matrix {matrix} (1 change per {(1 << matrix) - 1} samples): {size} bytes")
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}")
+
+@cli.command()
+@click.argument('directory')
+@click.option('--db', help='Index database (default: DIRECTORY/.ghostvault-index.db)')
+@click.option('--fit', type=int, help='Print the smallest indexed cover holding a payload of this many bytes')
+@click.option('--bits-per-sample', '-b', type=click.IntRange(1, 8), default=1,
+              help='Low bits per sample assumed by --fit')
+@click.option('--media', type=click.Choice(['image', 'audio']), help='Restrict --fit to one kind of cover')
+@click.option('--workers', '-w', type=int, help='Reader threads (default: Python thread pool default)')
+def index(directory, db, fit, bits_per_sample, media, workers):
+    """Build or refresh a cover index recording each cover's capacity."""
+    from utils.cover_index import DEFAULT_INDEX, CoverIndex
+    
+    try:
+        if not os.path.isdir(directory):
+            click.echo(f"Error: No such directory: {directory}")
+            return
+        
+        with CoverIndex(db or os.path.join(directory, DEFAULT_INDEX)) as cover_index:
+            # Only covers whose mtime or size changed are read again
+            counts = cover_index.update(directory, workers)
+            click.echo(", ".join(f"{count} {outcome}" for outcome, count in counts.items()), err=True)
+            
+            if fit is not None:
+                path = cover_index.best_fit(fit, bits_per_sample, media)
+                click.echo(path if path else "No indexed cover is large enough")
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}")
+
+@cli.command()
+@click.argument('payload_file')
+@click.argument('covers', nargs=-1, required=True)
+@click.option('--output-dir', '-o', required=True, help='Directory for the covers holding the shards')
+@click.option('--password', '-p', help='Password for encryption (optional)')
+@click.option('--bits-per-sample', '-b', type=click.IntRange(1, 8), default=1,
+              help='Most low bits used per sample; image covers use at most 4')
+@click.option('--scatter', is_flag=True, help='Spread each shard in an order keyed by the password')
+@click.option('--workers', '-w', type=int, help='Worker processes (default: CPU count)')
+@click.option('--results', '-r', type=click.File('w'), default='-', help='JSONL results file (default: stdout)')
+def split(payload_file, covers, output_dir, password, bits_per_sample, scatter, workers, results):
+    """Split a text or binary file too large for one cover across several covers."""
+    from utils.scanner import iter_covers
+    from utils.sharding import split_jobs, run_split
+    
+    try:
+        if not os.path.isfile(payload_file):
+            click.echo(f"Error: No such file: {payload_file}")
+            return
+        
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = split_jobs(payload_file, list(iter_covers(covers)), output_dir, password,
+                          bits_per_sample, scatter)
+        failed = 0
+        
+        for result in run_split(jobs, workers):
+            if result['status'] != 'ok':
+                failed += 1
+            results.write(json.dumps(result) + '\n')
+            results.flush()
+        
+        click.echo(f"Split {os.path.getsize(payload_file)} bytes into {len(jobs)} shards, "
+                   f"{failed} failed", err=True)
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}")
+
+@cli.command()
+@click.argument('source')
+@click.option('--action', '-a', type=click.Choice(['hide', 'extract']), default='hide',
+              help='Default action for directory jobs and manifest rows without one')
+@click.option('--message', '-m', help='Message to hide in every cover of a directory')
+@click.option('--message-file', help='File whose text is hidden in every cover of a directory')
+@click.option('--output-dir', '-o', help='Output directory for directory jobs')
+@click.option('--password-ref', '-p', help='Password reference: env:NAME, file:PATH or pass:VALUE')
+@click.option('--workers', '-w', type=int, help='Worker processes (default: CPU count)')
+@click.option('--results', '-r', type=click.File('w'), default='-', help='JSONL results file (default: stdout)')
+@click.option('--kdf', type=click.Choice(['pbkdf2', 'scrypt']), default='pbkdf2',
+              help='Password stretching function, run once per batch password')
+@click.option('--kdf-cost', type=int, help='PBKDF2 iterations or scrypt N (default: 100000 / 32768)')
+@click.option('--bits-per-sample', '-b', type=click.IntRange(1, 8), default=1,
+              help='Low bits used per sample for hide jobs without their own value')
+def batch(source, action, message, message_file, output_dir, password_ref, workers, results,
+          kdf, kdf_cost, bits_per_sample):
+    """Hide or extract across a directory or a JSONL/CSV manifest of jobs."""
+    from utils.batch import load_jobs, open_sessions, run_batch
+    
+    try:
+        if not os.path.exists(source):
+            click.echo(f"Error: No such directory or manifest: {source}")
+            return
+        
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        
+        jobs = load_jobs(source, action, message, message_file, output_dir, password_ref,
+                         bits_per_sample)
+        # Pay the password KDF once per batch rather than once per file
+        open_sessions(jobs, kdf, kdf_cost)
+        failed = 0
+        
+        # Stream one JSON line per job as soon as it completes
+        for result in run_batch(jobs, workers):
+            if result['status'] != 'ok':
+                failed += 1
+            results.write(json.dumps(result) + '\n')
+            results.flush()
+        
+        click.echo(f"Processed {len(jobs)} jobs, {failed} failed", err=True)
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}")
+
+@cli.command()
+@click.argument('paths', nargs=-1, required=True)
+@click.option('--workers', '-w', type=int, help='Reader threads (default: 4 per CPU, at most 32)')
+@click.option('--results', '-r', type=click.File('w'), default='-', help='JSONL results file (default: stdout)')
+@click.option('--analyze', is_flag=True, help='Also run chi-square and RS steganalysis on every cover '
+              '(8-bit samples only; 16, 24 and 32-bit WAVs report null estimates)')
+@click.option('--sample', 'sample_fraction', type=click.FloatRange(0, 1, min_open=True),
+              help='Analyse only this random fraction of sample blocks (with --analyze)')
+def scan(paths, workers, results, analyze, sample_fraction):
+    """Triage files and directory trees for hidden payloads from their headers."""
+    from utils.scanner import scan_tree
+    
+    try:
+        for path in paths:
+            if not os.path.exists(path):
+                click.echo(f"Error: No such file or directory: {path}")
+                return
+        
+        scanned = found = 0
+        # Only the first few hundred LSBs of each cover are read
+        for result in scan_tree(paths, workers, analyze=analyze, sample_fraction=sample_fraction):
+            scanned += 1
+            if result.get('payload') or result.get('analysis', {}).get('suspect'):
+                found += 1
+            results.write(json.dumps(result) + '\n')
+        
+        click.echo(f"Scanned {scanned} files, {found} flagged", err=True)
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}")
+
+@cli.command()
+@click.option('--host', default='127.0.0.1', show_default=True, help='Address to listen on')
+@click.option('--port', type=int, default=8765, show_default=True, help='TCP port to listen on')
+@click.option('--socket', 'socket_path', help='Listen on this Unix socket instead of TCP')
+@click.option('--workers', '-w', type=int, help='Worker processes (default: CPU count)')
+@click.option('--queue-size', type=int, default=64, show_default=True,
+              help='Jobs allowed to wait for a worker before requests get 503')
+@click.option('--max-body', type=int, help='Largest request body accepted, in bytes (default: 256 MiB)')
+def serve(host, port, socket_path, workers, queue_size, max_body):
+    """Run a local hide/extract server backed by a warm worker pool."""
+    import asyncio
+    from utils.server import MAX_BODY, serve as run_server
+
+    def ready(listener):
+        where = socket_path or f"http://{host}:{port}"
+        click.echo(f"GhostVault serving on {where}", err=True)
+    
+    try:
+        asyncio.run(run_server(host, port, socket_path, workers, queue_size,
+                               max_body or MAX_BODY, ready))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        click.echo(f"Error: {str(e)}")
+
 if __name__ == '__main__':
     cli()
\ No newline at end of file
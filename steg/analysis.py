@@ -0,0 +1,210 @@
+import math
+import mmap
+import numpy as np
+from PIL import Image
+from .riff import read_layout
+from .audio_steg import pcm_samples
+from .cover import cover_kind
+from .profiling import span
+
+# Frames per analysis block; sampled mode keeps a random subset of blocks
+BLOCK_FRAMES = 4096
+
+# Blocks analysed at once, bounding the working copies on huge covers
+CHUNK_BLOCKS = 256
+
+# Cumulative prefixes tested by the chi-square attack (1% resolution)
+CHI_SQUARE_STEPS = 100
+
+# Pairs of values expected less often than this are left out of the test
+MIN_EXPECTED = 4
+
+# Estimated embedding rate at which a cover is reported as suspect
+SUSPECT_RATE = 0.05
+
+# Widest samples the attacks are run on. Over 16 or 24-bit samples, pairs
+# of values are spread across so many levels that their counts come out
+# even anyway, and the LSB is noise next to neighbouring differences of
+# hundreds of levels, so both estimates say "embedded" for clean covers.
+MAX_SAMPLE_BITS = 8
+
+# RS groups are four neighbouring samples of one channel; the mask flips the middle two
+GROUP_SIZE = 4
+_MASK = np.array([False, True, True, False])
+
+
+def _chi2_sf(x, df):
+    """Upper tail of the chi-square distribution (Wilson-Hilferty approximation)."""
+    if df <= 0:
+        return 1.0
+    if x <= 0:
+        return 1.0
+    z = ((x / df) ** (1 / 3) - (1 - 2 / (9 * df))) / math.sqrt(2 / (9 * df))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _blocks(samples, channels, sample_fraction=None, seed=0):
+    """Cut interleaved samples into (blocks, BLOCK_FRAMES, channels), optionally sampled.
+
+    Sampled blocks stay in cover order, so prefix statistics still follow
+    the embedding order. Covers shorter than one block form a single block.
+    """
+    frames = len(samples) // channels
+    block_frames = BLOCK_FRAMES if frames >= BLOCK_FRAMES else frames // GROUP_SIZE * GROUP_SIZE
+    if block_frames == 0:
+        return samples[:0].reshape(0, 0, channels)
+    count = frames // block_frames
+    blocks = samples[:count * block_frames * channels].reshape(count, block_frames, channels)
+    if sample_fraction is not None and sample_fraction < 1:
+        keep = max(1, int(round(count * sample_fraction)))
+        chosen = np.sort(np.random.default_rng(seed).choice(count, keep, replace=False))
+        blocks = blocks[chosen]
+    return blocks
+
+
+def chi_square(blocks):
+    """Pairs-of-values chi-square attack over growing prefixes of 8-bit blocks.
+
+    Returns (p_value, rate): the probability that the whole cover is fully
+    embedded, and the largest prefix fraction for which that probability
+    stays above one half, an estimate of a sequential payload's share.
+    """
+    if blocks.size == 0:
+        return 0.0, 0.0
+    levels = 256
+    histogram = np.zeros(levels, dtype=np.int64)
+    steps = np.unique(np.linspace(0, len(blocks), CHI_SQUARE_STEPS + 1).astype(int))
+
+    p_value = 0.0
+    rate = 0.0
+    for start, end in zip(steps[:-1], steps[1:]):
+        values = np.ascontiguousarray(blocks[start:end]).reshape(-1).view(np.uint8)
+        histogram += np.bincount(values, minlength=levels)
+        # Full LSB embedding evens out each pair (2k, 2k+1)
+        even = histogram[0::2]
+        expected = (even + histogram[1::2]) / 2
+        keep = expected > MIN_EXPECTED
+        statistic = float(np.sum((even[keep] - expected[keep]) ** 2 / expected[keep]))
+        p_value = _chi2_sf(statistic, int(keep.sum()) - 1)
+        if p_value > 0.5 and rate == start / len(blocks):
+            rate = end / len(blocks)
+    return p_value, rate
+
+
+def _smoothness(groups):
+    """Discrimination function: total variation within each group."""
+    return np.abs(np.diff(groups, axis=1)).sum(axis=1)
+
+
+def _flip_negative(values):
+    """Shifted LSB flipping: -1 <-> 0, 1 <-> 2, 3 <-> 4, ..."""
+    return ((values + 1) ^ 1) - 1
+
+
+def _rs_counts(groups):
+    """Regular and singular group counts for the masks M and -M."""
+    base = _smoothness(groups)
+    counts = []
+    for flip in (lambda values: values ^ 1, _flip_negative):
+        flipped = groups.copy()
+        flipped[:, _MASK] = flip(groups[:, _MASK])
+        changed = _smoothness(flipped)
+        counts += [np.count_nonzero(changed > base), np.count_nonzero(changed < base)]
+    return np.array(counts, dtype=np.int64)
+
+
+def rs_analysis(blocks):
+    """Estimate the share of samples carrying payload with RS analysis.
+
+    Groups are four consecutive samples of one channel. The counts of
+    regular and singular groups, before and after flipping every LSB,
+    give a quadratic whose smaller root yields the embedding rate. Returns
+    None when the quadratic has no real root, as it does for covers whose
+    LSBs are almost all payload.
+    """
+    if blocks.size == 0:
+        return 0.0
+    counts = np.zeros(4, dtype=np.int64)
+    flipped_counts = np.zeros(4, dtype=np.int64)
+    total = 0
+    for start in range(0, len(blocks), CHUNK_BLOCKS):
+        chunk = blocks[start:start + CHUNK_BLOCKS].astype(np.int32)
+        # (blocks, frames, channels) -> groups of neighbouring frames per channel
+        groups = chunk.transpose(0, 2, 1).reshape(-1, GROUP_SIZE)
+        counts += _rs_counts(groups)
+        flipped_counts += _rs_counts(groups ^ 1)
+        total += len(groups)
+
+    r_m, s_m, r_neg, s_neg = counts / total
+    r_m1, s_m1, r_neg1, s_neg1 = flipped_counts / total
+    d0, d1 = r_m - s_m, r_m1 - s_m1
+    dn0, dn1 = r_neg - s_neg, r_neg1 - s_neg1
+
+    a = 2 * (d1 + d0)
+    b = dn0 - dn1 - d1 - 3 * d0
+    c = d0 - dn0
+    if abs(a) < 1e-12:
+        if abs(b) < 1e-12:
+            return None
+        z = -c / b
+    else:
+        discriminant = b * b - 4 * a * c
+        if discriminant < 0:
+            return None
+        roots = [(-b + sign * math.sqrt(discriminant)) / (2 * a) for sign in (1, -1)]
+        z = min(roots, key=abs)
+    if z == 0.5:
+        return 1.0
+    return float(min(max(z / (z - 0.5), 0.0), 1.0))
+
+
+def analyze_samples(samples, channels=1, sample_fraction=None, seed=0):
+    """Run both attacks over interleaved integer samples.
+
+    The embedding rate is the RS estimate, which holds for sequential and
+    scattered payloads alike; the chi-square prefix rate only tracks
+    sequential ones, and stands in for the RS estimate where RS analysis
+    has none, as on fully embedded covers. With `sample_fraction` only that share of blocks,
+    picked at random with `seed`, is examined, bounding the time spent on
+    huge covers. Samples wider than MAX_SAMPLE_BITS are not analysed: the
+    estimates are None and so is `suspect`.
+    """
+    bits = 8 * samples.dtype.itemsize
+    if bits > MAX_SAMPLE_BITS:
+        return {'chi_square_p': None, 'chi_square_rate': None, 'embedding_rate': None,
+                'suspect': None, 'blocks': 0, 'sample_bits': bits}
+    with span('analysis'):
+        blocks = _blocks(samples, channels, sample_fraction, seed)
+        p_value, chi_rate = chi_square(blocks)
+        rate = rs_analysis(blocks)
+        if rate is None:
+            rate = chi_rate
+    return {
+        'chi_square_p': round(p_value, 6),
+        'chi_square_rate': round(float(chi_rate), 4),
+        'embedding_rate': round(rate, 4),
+        'suspect': rate >= SUSPECT_RATE or p_value > 0.5,
+        'blocks': len(blocks),
+        'sample_bits': bits,
+    }
+
+
+def analyze_cover(path, sample_fraction=None, seed=0):
+    """Analyse the samples of an image or WAV file for LSB embedding."""
+    if cover_kind(path) == 'image':
+        with span('decode'):
+            img = Image.open(path)
+            samples = np.asarray(img)
+        return analyze_samples(samples.reshape(-1), len(img.getbands()), sample_fraction, seed)
+
+    with open(path, 'rb') as f:
+        layout = read_layout(f)
+        if layout.data_size < layout.sample_width:
+            return analyze_samples(pcm_samples(b'', layout.sample_width), layout.channels)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # Sampled blocks only page in the parts of the file they cover
+            samples = pcm_samples(mapped, layout.sample_width, layout.data_offset,
+                                  layout.data_size // layout.sample_width)
+            result = analyze_samples(samples, layout.channels, sample_fraction, seed)
+            del samples
+            return result
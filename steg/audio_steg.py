@@ -1,74 +1,380 @@
-import wave
+import mmap
+import os
+import shutil
 import numpy as np
-from .crypto import encrypt_message, decrypt_message
-
-def hide_in_audio(audio_path, message, output_path, password=None):
-    """Hide a message in an audio file using LSB steganography."""
-    with wave.open(audio_path, 'rb') as audio:
-        frames = audio.readframes(-1)
-        sound_data = np.frombuffer(frames, dtype=np.int16).copy()
-        params = audio.getparams()
-    
-    # Encrypt message if password provided
-    if password:
-        message = encrypt_message(message, password)
-    
-    # Add delimiter to mark end of message
-    message += "###END###"
-    
-    # Convert message to binary
-    binary_message = ''.join(format(ord(char), '08b') for char in message)
-    
-    # Hide message in LSBs of audio samples
-    for i, bit in enumerate(binary_message):
-        if i < len(sound_data):
-            sound_data[i] = (sound_data[i] & 0xFFFE) | int(bit)
-    
-    # Save modified audio
-    with wave.open(output_path, 'wb') as output_audio:
-        output_audio.setparams(params)
-        output_audio.writeframes(sound_data.tobytes())
-
-def extract_from_audio(audio_path, password=None):
-    """Extract a hidden message from an audio file."""
-    with wave.open(audio_path, 'rb') as audio:
-        frames = audio.readframes(-1)
-        sound_data = np.frombuffer(frames, dtype=np.int16)
-    
-    # Extract LSBs
-    binary_message = ""
-    for sample in sound_data:
-        binary_message += str(sample & 1)
-    
-    # Convert binary to text
-    message = ""
-    for i in range(0, len(binary_message), 8):
-        byte = binary_message[i:i+8]
-        if len(byte) == 8:
-            try:
-                char = chr(int(byte, 2))
-                message += char
-                
-                # Check for end delimiter
-                if message.endswith("###END###"):
-                    message = message[:-9]  # Remove delimiter
+from .bitcodec import embed_values, array_reader
+from .riff import read_layout, buffer_layout
+from .payload import (build_payload, payload_symbols, read_payload, decode_payload,
+                      parse_header, samples_needed)
+from .compression import MAX_MESSAGE_SIZE
+from .profiling import span
+from .scatter import permutation_for, embed_scattered, scatter_reader
+
+# Frames decoded per step; bounds peak memory whatever the file length
+BLOCK_FRAMES = 1 << 16
+
+# Most bits per sample; only the least significant byte of a sample is touched
+MAX_DEPTH = 8
+
+# Linux ioctl that shares the extents of one file with another (reflink)
+FICLONE = 0x40049409
+
+def _lsb_view(data, width, offset=0, count=None):
+    """Strided uint8 view of the least significant byte of each little-endian sample.
+
+    Works for any sample width without widening or copying the samples;
+    8-bit samples are their own least significant byte.
+    """
+    if count is None:
+        count = (len(data) - offset) // width
+    return np.frombuffer(data, dtype=np.uint8, count=count * width, offset=offset)[::width]
+
+def _select_channels(nchannels, channels):
+    """Validate a channel selection; None stands for every channel in order."""
+    if channels is None:
+        return None
+    selected = sorted(set(channels))
+    if not selected or selected[0] < 0 or selected[-1] >= nchannels:
+        raise ValueError(f"Channels must be between 0 and {nchannels - 1} for this file")
+    return None if len(selected) == nchannels else selected
+
+class ChannelOrder:
+    """Positions of the samples of selected channels among interleaved samples.
+
+    Sample i of the selection is channel `selected[i % k]` of frame
+    `i // k`. An `inner` permutation of the selection (scattered
+    embedding) reorders i first. Works as a permutation for
+    embed_scattered and scatter_reader.
+    """
+
+    def __init__(self, nchannels, selected, frames, inner=None):
+        self.nchannels = nchannels
+        self.selected = np.asarray(selected, dtype=np.int64)
+        self.size = frames * len(self.selected)
+        self.inner = inner
+
+    def take(self, start, count):
+        """Positions of the selected samples start .. start + count - 1."""
+        if self.inner is not None:
+            indices = self.inner.take(start, count)
+        else:
+            indices = np.arange(start, start + count, dtype=np.int64)
+        frames, slots = np.divmod(indices, len(self.selected))
+        return frames * self.nchannels + self.selected[slots]
+
+def _sample_order(total, nchannels, channels=None, password=None):
+    """Order payload symbols visit `total` interleaved samples in, or None for plain order."""
+    selected = _select_channels(nchannels, channels)
+    if selected is None:
+        return permutation_for(password, total) if password else None
+    frames = total // nchannels
+    inner = permutation_for(password, frames * len(selected)) if password else None
+    return ChannelOrder(nchannels, selected, frames, inner)
+
+def pcm_samples(data, width, offset=0, count=None):
+    """Signed integer values of little-endian PCM samples, for analysis.
+
+    8, 16 and 32-bit samples are plain views. 24-bit samples are read
+    through an overlapping 4-byte strided view and sign-extended, which
+    copies them once into int32; a last sample without a byte after it is
+    left out.
+    """
+    if count is None:
+        count = (len(data) - offset) // width
+    if width == 1:
+        return np.frombuffer(data, dtype=np.uint8, count=count, offset=offset)
+    if width in (2, 4):
+        return np.frombuffer(data, dtype=f'<i{width}', count=count, offset=offset)
+    if width != 3:
+        raise ValueError(f"Unsupported sample width: {width} bytes")
+    count = max(0, min(count, (len(data) - offset - 1) // 3))
+    words = np.ndarray((count,), dtype='<i4', buffer=data, offset=offset, strides=(3,))
+    return (words << 8) >> 8
+
+def _read_blocks(f, layout, block_frames):
+    """Yield the whole frames of a WAV file's data chunk, `block_frames` at a time.
+
+    The file is positioned before every read, so other reads of it may
+    come in between; a partial frame at the end is left out.
+    """
+    frame_size = layout.sample_width * layout.channels
+    position = layout.data_offset
+    end = position + layout.data_size // frame_size * frame_size
+    while position < end:
+        f.seek(position)
+        block = f.read(min(block_frames * frame_size, end - position))
+        if not block:
+            break
+        position += len(block)
+        yield block
+
+def _stream_reader(blocks, layout, channels=None):
+    """Return a read(count) callable over the sample LSBs of blocks from _read_blocks."""
+    width = layout.sample_width
+    nchannels = layout.channels
+    selected = _select_channels(nchannels, channels)
+    pending = np.empty(0, dtype=np.uint8)
+
+    def read(count):
+        nonlocal pending
+        parts = []
+        wanted = count
+        while wanted > 0:
+            if len(pending) == 0:
+                with span('decode'):
+                    pending = _lsb_view(next(blocks, b''), width)
+                    if selected is not None:
+                        pending = pending.reshape(-1, nchannels)[:, selected].reshape(-1)
+                if len(pending) == 0:
                     break
-            except ValueError:
-                continue
-    
-    if not message or not message.endswith("###END###") and "###END###" not in message:
-        if len(message) < 10:
-            return None
-    
-    # Clean message if delimiter found
-    if "###END###" in message:
-        message = message.split("###END###")[0]
-    
-    # Decrypt message if password provided
-    if password and message:
+            parts.append(pending[:wanted])
+            pending = pending[wanted:]
+            wanted -= len(parts[-1])
+        return np.concatenate(parts) if parts else pending[:0]
+
+    return read
+
+def _clone_file(source_path, target_path):
+    """Copy a file, sharing its blocks with the source where the filesystem allows."""
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        try:
+            import fcntl
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            return
+        except (ImportError, OSError):
+            pass
+    shutil.copyfile(source_path, target_path)
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+def _embed_pcm(buffer, layout, data, depth=1, scatter_password=None, channels=None):
+    """Flip sample LSBs of a WAV file image in a writable buffer or mmap.
+
+    `data` is a built payload. `scatter_password` scatters it over the
+    whole data chunk and `channels` restricts it to those channels.
+    """
+    total = layout.data_size // layout.sample_width
+    order = _sample_order(total, layout.channels, channels, scatter_password)
+    needed = samples_needed(len(data), depth, parse_header(data)[3])
+    if needed > (total if order is None else order.size):
+        raise ValueError("Message too long for the cover file")
+    count = needed if order is None else total
+    samples = _lsb_view(buffer, layout.sample_width, layout.data_offset, count)
+    if order is None:
+        values, masks = payload_symbols(data, depth, array_reader(samples))
+        with span('embed'):
+            embed_values(samples, values, masks)
+    else:
+        values, masks = payload_symbols(data, depth, scatter_reader(samples, order))
+        with span('embed'):
+            embed_scattered(samples, values, masks, order)
+
+def _read_pcm_payload(buffer, layout, password=None, channels=None):
+    """Read a payload straight from the data chunk of a WAV file image."""
+    total = layout.data_size // layout.sample_width
+    if total == 0:
+        return None
+    samples = _lsb_view(buffer, layout.sample_width, layout.data_offset, total)
+    order = _sample_order(total, layout.channels, channels)
+
+    def scattered():
+        return scatter_reader(samples, _sample_order(total, layout.channels, channels, password))
+
+    reader = array_reader(samples) if order is None else scatter_reader(samples, order)
+    return read_payload(reader, scattered if password else None)
+
+def _patch_in_place(path, data, depth=1, scatter_password=None, channels=None):
+    """Flip sample LSBs of a WAV file through a memory map of its data chunk."""
+    with open(path, 'r+b') as f:
+        layout = read_layout(f)
+
+        # Map only the pages that hold the samples being changed
+        if scatter_password or channels is not None:
+            length = 0
+        else:
+            needed = samples_needed(len(data), depth, parse_header(data)[3])
+            length = layout.data_offset + needed * layout.sample_width
+        with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_WRITE) as mapped:
+            _embed_pcm(mapped, layout, data, depth, scatter_password, channels)
+            mapped.flush()
+
+def hide_in_wav_buffer(buffer, message, password=None, depth=1, scatter=False, channels=None,
+                       matrix=0):
+    """Hide a message in a whole WAV file held in a writable buffer, in place.
+
+    The buffer (bytearray, writable memoryview, mmap) is patched directly,
+    so no frames are decoded, copied or re-encoded. `matrix` is the
+    Hamming code parameter, as for hide_in_audio.
+    """
+    if not 1 <= depth <= MAX_DEPTH:
+        raise ValueError(f"Bits per sample must be between 1 and {MAX_DEPTH} for audio")
+    if scatter and not password:
+        raise ValueError("Scattered embedding needs a password")
+
+    _embed_pcm(buffer, buffer_layout(buffer), build_payload(message, password, depth, matrix),
+               depth, password if scatter else None, channels)
+
+def read_wav_buffer_payload(buffer, password=None, channels=None):
+    """Read the raw payload of a WAV file held in memory, without copying it."""
+    return _read_pcm_payload(buffer, buffer_layout(buffer), password, channels)
+
+def hide_in_audio(audio_path, message, output_path, password=None,
+                  block_frames=BLOCK_FRAMES, inplace=False, depth=1, scatter=False,
+                  channels=None, matrix=0):
+    """Hide a message in an audio file using LSB steganography.
+
+    `audio_path` and `output_path` may also be binary file objects.
+    `depth` is the number of low bits used per sample (1-8), whatever the
+    sample width. `channels` lists the channels to embed in, all of them
+    by default; extraction needs the same list. With `inplace`, the output
+    is a copy of the input whose touched samples are patched through mmap;
+    an output path naming the input file is always patched that way.
+    `scatter` spreads the payload in an order keyed by the password; it
+    patches a copy the same way, so both paths must be files. A nonzero
+    `matrix` hides p bits in each block of 2^p - 1 samples with a Hamming
+    code, changing at most one of them (depth must be 1).
+    """
+    if not 1 <= depth <= MAX_DEPTH:
+        raise ValueError(f"Bits per sample must be between 1 and {MAX_DEPTH} for audio")
+    if scatter and not password:
+        raise ValueError("Scattered embedding needs a password")
+
+    # Encrypt message if password provided and wrap it in the binary header
+    data = build_payload(message, password, depth, matrix)
+    needed = samples_needed(len(data), depth, matrix)
+
+    # Streaming into the file being read would truncate it, so patch it instead
+    if (_is_path(audio_path) and _is_path(output_path) and os.path.exists(output_path)
+            and os.path.samefile(audio_path, output_path)):
+        inplace = True
+
+    if inplace or scatter:
+        if not (_is_path(audio_path) and _is_path(output_path)):
+            raise ValueError("In-place and scattered embedding need input and output file paths")
+        with open(audio_path, 'rb') as f:
+            layout = read_layout(f)
+        total = layout.data_size // layout.sample_width
+        order = _sample_order(total, layout.channels, channels)
+        if needed > (total if order is None else order.size):
+            raise ValueError("Message too long for the cover file")
+        if not os.path.exists(output_path) or not os.path.samefile(audio_path, output_path):
+            with span('write'):
+                _clone_file(audio_path, output_path)
+        # _embed_pcm times its own bitpack and embed stages
+        _patch_in_place(output_path, data, depth, password if scatter else None, channels)
+        return
+
+    # Chunks are copied byte for byte around the data chunk, so any PCM
+    # layout the chunk table describes streams through, extensible ones too
+    source = open(audio_path, 'rb') if _is_path(audio_path) else audio_path
+    try:
+        layout = read_layout(source)
+        frame_size = layout.sample_width * layout.channels
+        selected = _select_channels(layout.channels, channels)
+        used = layout.channels if selected is None else len(selected)
+        if needed > layout.data_size // frame_size * used:
+            raise ValueError("Message too long for the cover file")
+        if matrix:
+            # Matrix codes start from the cover LSBs, so read those first
+            reader = _stream_reader(_read_blocks(source, layout, block_frames), layout, channels)
+            values, masks = payload_symbols(data, depth, reader)
+        else:
+            values, masks = payload_symbols(data, depth)
+
+        target = open(output_path, 'wb') if _is_path(output_path) else output_path
         try:
-            message = decrypt_message(message, password)
-        except:
+            with span('write'):
+                source.seek(0)
+                target.write(source.read(layout.data_offset))
+
+            # Hide payload in LSBs of the first blocks of samples
+            position = 0
+            for block in _read_blocks(source, layout, block_frames):
+                if position < len(values):
+                    block = bytearray(block)
+                    samples = _lsb_view(block, layout.sample_width)
+                    frames = len(samples) // layout.channels
+                    end = position + frames * used
+                    with span('embed'):
+                        if selected is None:
+                            embed_values(samples, values[position:end], masks[position:end])
+                        else:
+                            order = ChannelOrder(layout.channels, selected, frames)
+                            embed_scattered(samples, values[position:end], masks[position:end], order)
+                    position = end
+                with span('write'):
+                    target.write(block)
+
+            # Copy a partial last frame and the chunks after the samples straight through
+            with span('write'):
+                source.seek(layout.data_offset + layout.data_size // frame_size * frame_size)
+                shutil.copyfileobj(source, target)
+        finally:
+            if target is not output_path:
+                target.close()
+    finally:
+        if source is not audio_path:
+            source.close()
+
+def _extract_mapped(audio_path, password=None, channels=None):
+    """Read a payload through a read-only memory map of the data chunk."""
+    with open(audio_path, 'rb') as f:
+        layout = read_layout(f)
+        if layout.data_size < layout.sample_width:
             return None
-    
-    return message if message else None
\ No newline at end of file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # Pages are only read from disk once the payload reader touches them
+            return _read_pcm_payload(mapped, layout, password, channels)
+
+def read_audio_payload(audio_path, block_frames=BLOCK_FRAMES, password=None, channels=None):
+    """Read the raw payload of an audio file or binary file object without decrypting it.
+
+    With a password, a cover without a sequential header is also tried in
+    the password's scattered order. `channels` must match the hide call.
+    """
+    if _is_path(audio_path):
+        try:
+            return _extract_mapped(audio_path, password, channels)
+        except (ValueError, OSError):
+            pass
+
+    # Fall back to reading the data chunk block by block
+    f = open(audio_path, 'rb') if _is_path(audio_path) else audio_path
+    try:
+        layout = read_layout(f)
+
+        def scattered():
+            # Scattered samples need random access, so read them all once
+            f.seek(layout.data_offset)
+            samples = _lsb_view(f.read(layout.data_size), layout.sample_width)
+            order = _sample_order(len(samples), layout.channels, channels, password)
+            return scatter_reader(samples, order)
+
+        # Read the header, then stop as soon as the payload is complete
+        return read_payload(_stream_reader(_read_blocks(f, layout, block_frames), layout, channels),
+                            scattered if password else None)
+    finally:
+        if f is not audio_path:
+            f.close()
+
+def read_audio_prefix(audio_path, count):
+    """Return the LSBs of the first `count` samples of a WAV file, reading only their bytes."""
+    f = open(audio_path, 'rb') if _is_path(audio_path) else audio_path
+    try:
+        layout = read_layout(f)
+        width = layout.sample_width
+        f.seek(layout.data_offset)
+        data = f.read(min(count * width, layout.data_size) // width * width)
+        return _lsb_view(data, width)
+    finally:
+        if f is not audio_path:
+            f.close()
+
+def extract_from_audio(audio_path, password=None, block_frames=BLOCK_FRAMES,
+                       max_size=MAX_MESSAGE_SIZE, channels=None):
+    """Extract a hidden message from an audio file."""
+    payload = read_audio_payload(audio_path, block_frames, password, channels)
+
+    # Decrypt message if password provided
+    return decode_payload(payload, password, max_size)
@@ -0,0 +1,144 @@
+import importlib
+import os
+
+
+class Backend:
+    """A cover format: its file extensions, capacity probe and hide/extract entry points.
+
+    `module` names the module holding the entry points, given as keyword
+    arguments mapping entry point names to function names. The module is
+    imported the first time one of them is called, so registering a
+    backend costs nothing until a cover of its kind is touched. `probe`
+    reads a cover's header and returns its geometry and sample count; it
+    should import only what that needs.
+    """
+
+    def __init__(self, name, media, extensions, module, probe, **entry_points):
+        self.name = name
+        self.media = media
+        self.extensions = [ext.lower() for ext in extensions]
+        self.module_name = module
+        self.probe = probe
+        self.entry_points = entry_points
+        self._module = None
+
+    def load(self):
+        """Import the backend module on first use and return it."""
+        if self._module is None:
+            self._module = importlib.import_module(self.module_name)
+        return self._module
+
+    @property
+    def max_depth(self):
+        """Most bits per sample the backend embeds."""
+        return self.load().MAX_DEPTH
+
+    def __getattr__(self, name):
+        entry_points = self.__dict__.get('entry_points', {})
+        if name not in entry_points:
+            raise AttributeError(f"Backend {self.__dict__.get('name')!r} has no entry point {name!r}")
+        return getattr(self.load(), entry_points[name])
+
+    def __repr__(self):
+        return f"Backend({self.name!r}, {self.media!r}, {self.extensions!r})"
+
+
+_BACKENDS = []
+_BY_EXTENSION = {}
+
+# Extensions of lossy formats, mapped to the lossless one hidden payloads are saved in
+LOSSY_EXTENSIONS = {'.jpg': '.png', '.jpeg': '.png', '.gif': '.png'}
+
+
+def register(backend):
+    """Add a backend; later registrations win for a shared extension."""
+    _BACKENDS.append(backend)
+    for ext in backend.extensions:
+        _BY_EXTENSION[ext] = backend
+    return backend
+
+
+def backends(media=None):
+    """Registered backends, optionally only those for 'image' or 'audio'."""
+    return [backend for backend in _BACKENDS if media is None or backend.media == media]
+
+
+def extensions(media=None):
+    """File extensions handled by the registered backends."""
+    return [ext for backend in backends(media) for ext in backend.extensions]
+
+
+def find_backend(path):
+    """The backend for a file path by its extension, or None."""
+    return _BY_EXTENSION.get(os.path.splitext(path)[1].lower())
+
+
+def backend_for(path):
+    """The backend for a file path; raises ValueError for unknown extensions."""
+    backend = find_backend(path)
+    if backend is None:
+        raise ValueError(f"Unsupported file format: {os.path.splitext(path)[1].lower()}")
+    return backend
+
+
+def media_backend(media):
+    """The first backend registered for a media kind, used for in-memory covers."""
+    for backend in _BACKENDS:
+        if backend.media == media:
+            return backend
+    raise ValueError(f"No backend registered for {media}")
+
+
+def lossless_output(path):
+    """`path`, with its extension swapped for a lossless one if its format is lossy."""
+    root, ext = os.path.splitext(path)
+    return root + LOSSY_EXTENSIONS[ext.lower()] if ext.lower() in LOSSY_EXTENSIONS else path
+
+
+def _probe_image(path):
+    from PIL import Image
+
+    with Image.open(path) as img:
+        if getattr(img, 'n_frames', 1) > 1:
+            return _probe_frames(path)
+        bands = len(img.getbands())
+        return {'media': 'image', 'format': img.format, 'width': img.width,
+                'height': img.height, 'bands': bands,
+                'samples': img.width * img.height * bands}
+
+
+def _probe_frames(path):
+    from PIL import Image
+    from .frames_steg import probe_frames
+
+    with Image.open(path) as img:
+        return probe_frames(img)
+
+
+def _probe_wav(path):
+    # The chunk table, not the wave module, which rejects WAVE_FORMAT_EXTENSIBLE before 3.12
+    from .riff import read_layout
+
+    with open(path, 'rb') as f:
+        layout = read_layout(f)
+    frames = layout.data_size // (layout.sample_width * layout.channels)
+    return {'media': 'audio', 'format': 'WAV', 'frames': frames,
+            'channels': layout.channels, 'sample_width': layout.sample_width,
+            'samples': frames * layout.channels}
+
+
+register(Backend('pil', 'image', ['.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp'],
+                 'steg.image_steg', _probe_image,
+                 hide='hide_in_image', extract='extract_from_image',
+                 read_payload='read_image_payload', read_prefix='read_image_prefix'))
+
+# Animations and multi-page files; multi-frame PNG and TIFF covers are
+# handed over by the pil backend once it sees more than one frame
+register(Backend('frames', 'image', ['.gif', '.apng'], 'steg.frames_steg', _probe_frames,
+                 hide='hide_in_frames', extract='extract_from_frames',
+                 read_payload='read_frames_payload', read_prefix='read_frames_prefix'))
+
+register(Backend('wav', 'audio', ['.wav'], 'steg.audio_steg', _probe_wav,
+                 hide='hide_in_audio', extract='extract_from_audio',
+                 read_payload='read_audio_payload', read_prefix='read_audio_prefix',
+                 hide_buffer='hide_in_wav_buffer', read_buffer='read_wav_buffer_payload'))
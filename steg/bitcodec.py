@@ -0,0 +1,161 @@
+import numpy as np
+
+# Number of payload bytes decoded per step while searching for a delimiter
+SCAN_CHUNK_BYTES = 1 << 16
+
+
+def text_to_bytes(message):
+    """Encode a text message for embedding."""
+    return message.encode('utf-8')
+
+
+def bytes_to_text(data):
+    """Decode embedded bytes back into text."""
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        # Covers written one char per byte can hold non UTF-8 text
+        return data.decode('latin-1')
+
+
+def bytes_to_bits(data):
+    """Unpack bytes into an array of bits, most significant bit first."""
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+
+def bits_to_bytes(bits):
+    """Pack an array of bits, most significant bit first, into bytes."""
+    return np.packbits(bits).tobytes()
+
+
+def bits_to_values(bits, depth=1):
+    """Group bits into `depth`-bit sample values, zero padding the last one."""
+    if depth == 1:
+        return bits.astype(np.uint8)
+    padded = np.zeros(-(-len(bits) // depth) * depth, dtype=np.uint8)
+    padded[:len(bits)] = bits
+    # Shift each group's bits in column by column, most significant first
+    groups = padded.reshape(-1, depth)
+    values = groups[:, 0].copy()
+    for column in range(1, depth):
+        values <<= 1
+        values |= groups[:, column]
+    return values
+
+
+def values_to_bits(values, depth=1):
+    """Split `depth`-bit sample values back into bits."""
+    if depth == 1:
+        return values.astype(np.uint8)
+    groups = np.unpackbits(values.astype(np.uint8).reshape(-1, 1), axis=1)
+    return groups[:, 8 - depth:].reshape(-1)
+
+
+def embed_values(samples, values, masks, offset=0):
+    """Write values into the masked low bits of a 1-D sample array in place."""
+    end = offset + len(values)
+    if end > len(samples):
+        raise ValueError("Message too long for the cover file")
+
+    region = samples[offset:end]
+    # Flip only the low bits that differ from the wanted value
+    region ^= (region ^ values.astype(region.dtype)) & masks.astype(region.dtype)
+
+
+def embed_bits(samples, bits, offset=0, depth=1):
+    """Write bits into the low `depth` bits of a 1-D sample array in place."""
+    values = bits_to_values(bits, depth)
+    embed_values(samples, values, np.full(len(values), (1 << depth) - 1, dtype=np.uint8), offset)
+
+
+def extract_bits(samples, count, offset=0, depth=1):
+    """Read `count` bits from the low `depth` bits of a 1-D sample array."""
+    region = samples[offset:offset + -(-count // depth)]
+    return values_to_bits(region & ((1 << depth) - 1), depth)[:count]
+
+
+def embed_bytes(samples, data, offset=0, depth=1):
+    """Write bytes into the low bits of a 1-D sample array in place."""
+    embed_bits(samples, bytes_to_bits(data), offset, depth)
+
+
+def extract_bytes(samples, count, offset=0, depth=1):
+    """Read `count` bytes from the low bits of a 1-D sample array."""
+    bits = extract_bits(samples, count * 8, offset, depth)
+    usable = len(bits) - len(bits) % 8
+    return bits_to_bytes(bits[:usable])
+
+
+def _syndromes(blocks, matrix):
+    """Hamming syndrome of each row of LSBs: the XOR of the 1-based positions of set bits."""
+    if matrix <= 3:
+        # Short rows reduce slowly; one pass per column is faster there
+        syndromes = np.zeros(len(blocks), dtype=np.uint8)
+        for position in range(blocks.shape[1]):
+            syndromes ^= blocks[:, position] * np.uint8(position + 1)
+        return syndromes
+    positions = np.arange(1, (1 << matrix), dtype=np.uint8)
+    return np.bitwise_xor.reduce(blocks * positions, axis=1)
+
+
+def matrix_embed(samples, bits, matrix):
+    """Return the LSBs of `samples` changed to carry `bits` in a (1, 2^p - 1, p) Hamming code.
+
+    Each block of 2^p - 1 samples takes p bits as its syndrome, so at most
+    one LSB per block is flipped. All blocks are encoded at once. Returns
+    None when the samples don't cover every block.
+    """
+    block = (1 << matrix) - 1
+    symbols = bits_to_values(bits, matrix)
+    if len(samples) < len(symbols) * block:
+        return None
+    blocks = (samples[:len(symbols) * block] & 1).astype(np.uint8).reshape(-1, block)
+    # The position to flip turns the block's syndrome into the message symbol
+    flips = _syndromes(blocks, matrix) ^ symbols
+    changed = np.flatnonzero(flips)
+    samples = blocks.reshape(-1)
+    samples[changed * block + flips[changed] - 1] ^= 1
+    return samples
+
+
+def extract_matrix_bytes(samples, count, matrix):
+    """Read `count` bytes from the block syndromes of a Hamming-coded sample array."""
+    block = (1 << matrix) - 1
+    usable = min(len(samples) // block, -(-count * 8 // matrix))
+    blocks = (samples[:usable * block] & 1).astype(np.uint8).reshape(-1, block)
+    bits = values_to_bits(_syndromes(blocks, matrix), matrix)[:count * 8]
+    return bits_to_bytes(bits[:len(bits) - len(bits) % 8])
+
+
+def array_reader(samples):
+    """Return a read(count) callable that walks a 1-D sample array in order."""
+    position = 0
+
+    def read(count):
+        nonlocal position
+        chunk = samples[position:position + count]
+        position += len(chunk)
+        return chunk
+
+    return read
+
+
+def extract_until(read_samples, delimiter, prefix=b""):
+    """Read bytes from the LSBs until `delimiter` is found.
+
+    `read_samples(count)` returns the next samples of the cover and `prefix`
+    holds bytes the caller has already decoded. The LSB plane is decoded in
+    chunks so that only the part of the cover holding the message is
+    touched. Returns None if the delimiter is missing.
+    """
+    data = bytearray(prefix)
+    index = data.find(delimiter)
+    while index == -1:
+        chunk = extract_bytes(read_samples(SCAN_CHUNK_BYTES * 8), SCAN_CHUNK_BYTES)
+        if not chunk:
+            return None
+        # Only rescan the tail that could contain a split delimiter
+        start = max(0, len(data) - len(delimiter) + 1)
+        data += chunk
+        index = data.find(delimiter, start)
+    return bytes(data[:index])
@@ -0,0 +1,97 @@
+import bz2
+import lzma
+import zlib
+from functools import lru_cache
+
+# Header flags naming the codec a payload body was compressed with
+FLAG_ZLIB = 0x02
+FLAG_BZ2 = 0x04
+FLAG_LZMA = 0x08
+FLAG_COMPRESSED = FLAG_ZLIB | FLAG_BZ2 | FLAG_LZMA
+CODEC_NAMES = {FLAG_ZLIB: 'zlib', FLAG_BZ2: 'bz2', FLAG_LZMA: 'lzma'}
+
+# Default cap on the size of a decompressed message
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+# Largest LZMA dictionary used; preset 9 alone would reserve ~700 MB
+_LZMA_MAX_DICT = 64 * 1024 * 1024
+
+# Messages larger than four samples of this size are first sampled at the
+# start, middle and end with fast zlib; when that saves under 2% the
+# codecs are skipped, as they would cost seconds on megabytes for nothing
+_SAMPLE_SIZE = 64 * 1024
+_MIN_SAVING = 0.02
+
+
+def _lzma_compress(data):
+    """LZMA at preset 9 with a dictionary no larger than the data needs."""
+    dict_size = min(max(4096, 1 << max(len(data) - 1, 1).bit_length()), _LZMA_MAX_DICT)
+    filters = [{'id': lzma.FILTER_LZMA2, 'preset': 9, 'dict_size': dict_size}]
+    return lzma.compress(data, filters=filters)
+
+
+_COMPRESSORS = {
+    FLAG_ZLIB: lambda data: zlib.compress(data, 9),
+    FLAG_BZ2: lambda data: bz2.compress(data, 9),
+    FLAG_LZMA: _lzma_compress,
+}
+
+_DECOMPRESSORS = {
+    FLAG_ZLIB: zlib.decompressobj,
+    FLAG_BZ2: bz2.BZ2Decompressor,
+    FLAG_LZMA: lzma.LZMADecompressor,
+}
+
+
+def _incompressible(data):
+    """Whether samples of a large message show it won't compress, e.g. encrypted or media data."""
+    if len(data) <= 4 * _SAMPLE_SIZE:
+        return False
+    middle = (len(data) - _SAMPLE_SIZE) // 2
+    sample = data[:_SAMPLE_SIZE] + data[middle:middle + _SAMPLE_SIZE] + data[-_SAMPLE_SIZE:]
+    return len(zlib.compress(sample, 1)) > len(sample) * (1 - _MIN_SAVING)
+
+
+def compress(data):
+    """Compress with the codec giving the smallest output.
+
+    Returns (flag, data); the flag is 0 and the data unchanged when no
+    codec makes the payload smaller. The last results are cached, so
+    sizing a payload and then building it compresses the message once.
+    """
+    return _compress(bytes(data))
+
+
+@lru_cache(maxsize=2)
+def _compress(data):
+    if _incompressible(data):
+        return 0, data
+    best_flag, best = 0, data
+    for flag, compressor in _COMPRESSORS.items():
+        candidate = compressor(data)
+        if len(candidate) < len(best):
+            best_flag, best = flag, candidate
+    return best_flag, best
+
+
+def decompress(flags, data, max_size=MAX_MESSAGE_SIZE):
+    """Decompress a payload body, refusing output larger than `max_size`."""
+    codec = flags & FLAG_COMPRESSED
+    if not codec:
+        return data
+
+    if codec not in _DECOMPRESSORS:
+        raise ValueError("Unknown compression codec")
+
+    # Ask for one byte more than allowed so oversized output is caught early
+    decompressor = _DECOMPRESSORS[codec]()
+    try:
+        output = decompressor.decompress(data, max_size + 1)
+    except (zlib.error, OSError, lzma.LZMAError):
+        raise ValueError("Compressed message is truncated or corrupted")
+
+    if len(output) > max_size:
+        raise ValueError(f"Decompressed message exceeds the {max_size} byte limit")
+    if not decompressor.eof:
+        raise ValueError("Compressed message is truncated or corrupted")
+    return output
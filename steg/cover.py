@@ -0,0 +1,129 @@
+import base64
+import binascii
+import io
+import os
+import numpy as np
+from .backends import backend_for, media_backend
+from .bitcodec import array_reader
+from .payload import FLAG_ENCRYPTED, PROBE_SAMPLES, read_payload, probe_payload, decode_payload
+from .compression import MAX_MESSAGE_SIZE
+from .scatter import permutation_for, scatter_reader
+
+# Bytes-like cover types handed around without copying
+BUFFER_TYPES = (bytes, bytearray, memoryview)
+
+
+def _sniff(head):
+    """Tell an audio cover from an image cover by its first 12 bytes."""
+    return 'audio' if head[:4] == b'RIFF' and head[8:12] == b'WAVE' else 'image'
+
+
+def cover_kind(cover):
+    """Return 'image', 'audio' or 'array' for a path, buffer, file object or array."""
+    if isinstance(cover, np.ndarray):
+        return 'array'
+    if isinstance(cover, (str, os.PathLike)):
+        return backend_for(os.fspath(cover)).media
+    if isinstance(cover, BUFFER_TYPES):
+        return _sniff(bytes(memoryview(cover).cast('B')[:12]))
+    if hasattr(cover, 'read'):
+        cover.seek(0)
+        head = cover.read(12)
+        cover.seek(0)
+        return _sniff(head)
+    raise TypeError(f"Unsupported cover type: {type(cover).__name__}")
+
+
+def cover_backend(cover, kind=None):
+    """The backend for a path by extension, or for in-memory covers by media kind."""
+    if isinstance(cover, (str, os.PathLike)):
+        return backend_for(os.fspath(cover))
+    return media_backend(kind or cover_kind(cover))
+
+
+def read_cover_payload(cover, password=None):
+    """Read the raw payload of any cover `cover_kind` accepts.
+
+    A password also finds payloads scattered in its keyed order.
+    """
+    kind = cover_kind(cover)
+    if kind == 'array':
+        samples = cover.reshape(-1)
+
+        def scattered():
+            return scatter_reader(samples, permutation_for(password, samples.size))
+
+        return read_payload(array_reader(samples), scattered if password else None)
+    backend = cover_backend(cover, kind)
+    if kind == 'audio':
+        if isinstance(cover, BUFFER_TYPES):
+            return backend.read_buffer(cover, password)
+        return backend.read_payload(cover, password=password)
+    if isinstance(cover, BUFFER_TYPES):
+        cover = io.BytesIO(cover)
+    return backend.read_payload(cover, password=password)
+
+
+def probe_cover(cover, samples=PROBE_SAMPLES):
+    """Probe the first `samples` LSBs of a cover for a payload header.
+
+    Only those samples are decoded or read, so this is far cheaper than
+    extraction; returns a Probe or None.
+    """
+    kind = cover_kind(cover)
+    if kind == 'array':
+        return probe_payload(cover.reshape(-1)[:samples])
+    backend = cover_backend(cover, kind)
+    if isinstance(cover, BUFFER_TYPES):
+        cover = io.BytesIO(cover)
+    prefix = backend.read_prefix(cover, samples)
+    return probe_payload(prefix)
+
+
+class OpenedCover:
+    """A cover file decoded once, with its raw payload and message cached.
+
+    Detection and raw display use the message decoded on opening and
+    decryption works from the cached payload, so revealing a message
+    costs a single pass over the cover. `path` may
+    be any cover `cover_kind` accepts, not only a file path. Scattered
+    payloads can only be found once a password is given to reveal().
+    """
+
+    def __init__(self, path, max_size=MAX_MESSAGE_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self._use(read_cover_payload(path))
+
+    def _use(self, payload):
+        """Cache a payload and its message, decoded once without a password."""
+        self.payload = payload
+        self.raw_message = decode_payload(payload, max_size=self.max_size)
+
+    @property
+    def found(self):
+        """Whether the cover carries a readable payload."""
+        return self.raw_message is not None
+
+    @property
+    def is_encrypted(self):
+        """Whether the payload is password protected."""
+        if not self.found:
+            return False
+        if not self.payload.legacy:
+            return bool(self.payload.flags & FLAG_ENCRYPTED)
+
+        # Delimited covers carry no flags; encrypted ones hold base64 text
+        try:
+            decoded = base64.b64decode(self.payload.data, validate=True)
+            return len(decoded) > 16 and len(self.payload.data) > 20
+        except (binascii.Error, ValueError):
+            return False
+
+    def reveal(self, password=None):
+        """Return the message, decrypted with `password` if given, or None."""
+        if self.payload is None and password:
+            # Without a sequential header the payload may be scattered
+            self._use(read_cover_payload(self.path, password))
+        return decode_payload(self.payload, password, self.max_size)
+
@@ -1,18 +1,60 @@
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+from functools import lru_cache
 import base64
 import os
+import struct
+from .profiling import span
 
-def _derive_key(password: str, salt: bytes) -> bytes:
-    """Derive encryption key from password."""
+# Binary blob layout: format byte, salt, nonce, AES-GCM ciphertext and tag.
+# The format byte can never start the base64 text of a Fernet payload.
+AEAD_FORMAT = 0x01
+SALT_SIZE = 16
+NONCE_SIZE = 12
+TAG_SIZE = 16
+AEAD_OVERHEAD = 1 + SALT_SIZE + NONCE_SIZE + TAG_SIZE
+
+# Session blob layout: format byte, KDF id, KDF cost, session salt, file
+# salt, nonce, then the AES-GCM ciphertext and tag
+SESSION_FORMAT = 0x02
+_SESSION_HEADER = struct.Struct(">BBI16s16s12s")
+SESSION_OVERHEAD = _SESSION_HEADER.size + TAG_SIZE
+
+# Password stretching functions usable for sessions and their default cost:
+# PBKDF2 iterations, or the scrypt CPU/memory cost N (r=8, p=1)
+KDF_PBKDF2 = 1
+KDF_SCRYPT = 2
+KDF_NAMES = {'pbkdf2': KDF_PBKDF2, 'scrypt': KDF_SCRYPT}
+DEFAULT_KDF_COST = {KDF_PBKDF2: 100000, KDF_SCRYPT: 1 << 15}
+
+# Highest cost accepted, from the caller or from a blob: a crafted cover
+# could otherwise name a KDF that runs for hours or needs gigabytes
+# (scrypt uses 128 * r * N bytes, 1 GiB at the limit)
+MAX_KDF_COST = {KDF_PBKDF2: 10000000, KDF_SCRYPT: 1 << 20}
+
+# Fixed salt of the key that orders scattered samples: extractors need the
+# ordering before they can read any per-payload salt
+SCATTER_SALT = b"ghostvault scatter"
+
+def _derive_raw_key(password: str, salt: bytes) -> bytes:
+    """Derive a 256-bit key from password."""
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
         length=32,
         salt=salt,
         iterations=100000,
     )
-    return base64.urlsafe_b64encode(kdf.derive(password.encode()))
+    with span('kdf'):
+        return kdf.derive(password.encode())
+
+def _derive_key(password: str, salt: bytes) -> bytes:
+    """Derive encryption key from password."""
+    return base64.urlsafe_b64encode(_derive_raw_key(password, salt))
 
 def encrypt_message(message: str, password: str) -> str:
     """Encrypt a message using AES encryption."""
@@ -37,4 +79,130 @@ def decrypt_message(encrypted_message: str, password: str) -> str:
         decrypted_data = fernet.decrypt(ciphertext)
         return decrypted_data.decode()
     except Exception:
-        raise ValueError("Decryption failed - incorrect password or corrupted data")
\ No newline at end of file
+        raise ValueError("Decryption failed - incorrect password or corrupted data")
+
+def encrypt_bytes(data: bytes, password) -> bytes:
+    """Encrypt raw bytes with AES-256-GCM into a compact binary blob.
+
+    `password` is a string, or a KeySession to skip the per-file KDF.
+    """
+    if isinstance(password, KeySession):
+        return password.encrypt(data)
+    
+    salt = os.urandom(SALT_SIZE)
+    nonce = os.urandom(NONCE_SIZE)
+    key = _derive_raw_key(password, salt)
+    
+    header = bytes([AEAD_FORMAT])
+    # The format byte is authenticated along with the ciphertext
+    with span('encrypt'):
+        return header + salt + nonce + AESGCM(key).encrypt(nonce, data, header)
+
+def decrypt_bytes(blob: bytes, password: str) -> bytes:
+    """Decrypt a blob from encrypt_bytes, or a legacy Fernet payload."""
+    if blob[:1] == bytes([SESSION_FORMAT]):
+        return _decrypt_session(blob, password)
+    
+    if blob[:1] != bytes([AEAD_FORMAT]):
+        # Older payloads hold the base64 text produced by encrypt_message
+        try:
+            text = blob.decode('ascii')
+        except UnicodeDecodeError:
+            raise ValueError("Decryption failed - incorrect password or corrupted data")
+        return decrypt_message(text, password).encode()
+    
+    if len(blob) < AEAD_OVERHEAD:
+        raise ValueError("Decryption failed - incorrect password or corrupted data")
+    
+    salt = blob[1:1 + SALT_SIZE]
+    nonce = blob[1 + SALT_SIZE:1 + SALT_SIZE + NONCE_SIZE]
+    key = _derive_raw_key(password, salt)
+    try:
+        with span('decrypt'):
+            return AESGCM(key).decrypt(nonce, blob[1 + SALT_SIZE + NONCE_SIZE:], blob[:1])
+    except InvalidTag:
+        raise ValueError("Decryption failed - incorrect password or corrupted data")
+
+
+def check_kdf_cost(kdf: int, cost: int):
+    """Reject a KDF and cost that _stretch refuses to run."""
+    if kdf not in MAX_KDF_COST:
+        raise ValueError(f"Unknown key derivation function: {kdf}")
+    if not 1 <= cost <= MAX_KDF_COST[kdf]:
+        raise ValueError(f"KDF cost must be between 1 and {MAX_KDF_COST[kdf]}")
+    if kdf == KDF_SCRYPT and (cost < 2 or cost & (cost - 1)):
+        raise ValueError("scrypt cost must be a power of two above 1")
+
+@lru_cache(maxsize=32)
+def _stretch(password: str, kdf: int, cost: int, salt: bytes) -> bytes:
+    """Stretch a password into a session master key; recent results are cached."""
+    check_kdf_cost(kdf, cost)
+    if kdf == KDF_PBKDF2:
+        stretcher = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=cost)
+    else:
+        stretcher = Scrypt(salt=salt, length=32, n=cost, r=8, p=1)
+    with span('kdf'):
+        return stretcher.derive(password.encode())
+
+def _file_key(master: bytes, file_salt: bytes) -> bytes:
+    """Derive the key of one file from a session master key."""
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=file_salt,
+                info=b"ghostvault file key").derive(master)
+
+class KeySession:
+    """A password stretched once, from which per-file keys are derived cheaply.
+
+    Pass a session wherever a password is accepted for encryption: each file
+    still gets its own salt, key and nonce, but the expensive KDF runs only
+    when the session is created. The KDF and its cost are stored in every
+    blob, so decrypting needs nothing but the password.
+    """
+
+    def __init__(self, password: str, kdf: str = 'pbkdf2', cost: int = None):
+        if kdf not in KDF_NAMES:
+            raise ValueError(f"Unknown key derivation function: {kdf}")
+        self.kdf = KDF_NAMES[kdf]
+        self.cost = cost or DEFAULT_KDF_COST[self.kdf]
+        check_kdf_cost(self.kdf, self.cost)
+        self.salt = os.urandom(SALT_SIZE)
+        self.master = _stretch(password, self.kdf, self.cost, self.salt)
+        self.password = password
+
+    def encrypt(self, data: bytes) -> bytes:
+        """Encrypt raw bytes under a fresh per-file key."""
+        file_salt = os.urandom(SALT_SIZE)
+        nonce = os.urandom(NONCE_SIZE)
+        header = _SESSION_HEADER.pack(SESSION_FORMAT, self.kdf, self.cost,
+                                      self.salt, file_salt, nonce)
+        key = _file_key(self.master, file_salt)
+        with span('encrypt'):
+            return header + AESGCM(key).encrypt(nonce, data, header)
+
+def scatter_key(password) -> bytes:
+    """Key of the sample ordering used by scattered embedding."""
+    if isinstance(password, KeySession):
+        password = password.password
+    return _stretch(password, KDF_PBKDF2, DEFAULT_KDF_COST[KDF_PBKDF2], SCATTER_SALT)
+
+def encryption_overhead(password) -> int:
+    """Bytes that encrypt_bytes adds to the plaintext for this password or session."""
+    return SESSION_OVERHEAD if isinstance(password, KeySession) else AEAD_OVERHEAD
+
+def _decrypt_session(blob: bytes, password: str) -> bytes:
+    """Decrypt a blob written by KeySession.encrypt."""
+    if len(blob) < SESSION_OVERHEAD:
+        raise ValueError("Decryption failed - incorrect password or corrupted data")
+    
+    header = blob[:_SESSION_HEADER.size]
+    _, kdf, cost, salt, file_salt, nonce = _SESSION_HEADER.unpack(header)
+    # The KDF and cost come from the cover, so bound them before stretching
+    try:
+        check_kdf_cost(kdf, cost)
+    except ValueError:
+        raise ValueError("Decryption failed - unsupported or excessive key derivation cost")
+    key = _file_key(_stretch(password, kdf, cost, salt), file_salt)
+    try:
+        with span('decrypt'):
+            return AESGCM(key).decrypt(nonce, blob[_SESSION_HEADER.size:], header)
+    except InvalidTag:
+        raise ValueError("Decryption failed - incorrect password or corrupted data")
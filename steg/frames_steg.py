@@ -0,0 +1,291 @@
+import io
+import os
+import struct
+import zlib
+from PIL import Image, ImageSequence, TiffImagePlugin
+import numpy as np
+from .bitcodec import embed_values
+from .payload import build_payload, payload_symbols, read_payload, decode_payload, samples_needed
+from .compression import MAX_MESSAGE_SIZE
+from .profiling import span
+from .image_steg import ENCODER_PROFILES, DEFAULT_PROFILE, LOSSY_FORMATS, MAX_DEPTH
+
+# Formats multi-frame outputs are written in, frame by frame
+FRAME_FORMATS = ('PNG', 'TIFF')
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def _frame_mode(frame):
+    """Mode a frame is embedded in: palette frames are expanded to true colour.
+
+    GIF frames after the first come out of Pillow as RGB or RGBA, so
+    expanding the first one too gives every frame the same kind of samples.
+    """
+    if frame.mode in ('P', 'PA'):
+        return 'RGBA' if frame.mode == 'PA' or 'transparency' in frame.info else 'RGB'
+    return frame.mode
+
+def _frame_image(frame, mode=None):
+    """A copy of the current frame in the mode it is embedded in."""
+    mode = mode or _frame_mode(frame)
+    return frame.copy() if frame.mode == mode else frame.convert(mode)
+
+def probe_frames(img):
+    """Geometry and embeddable samples of an opened multi-frame image.
+
+    Animations share one canvas, so only multi-page TIFFs are walked page
+    by page; that reads their page headers but decodes nothing.
+    """
+    frames = img.n_frames
+    bands = Image.getmodebands(_frame_mode(img))
+    if img.format == 'TIFF':
+        samples = sum(page.width * page.height * Image.getmodebands(_frame_mode(page))
+                      for page in ImageSequence.Iterator(img))
+        img.seek(0)
+    else:
+        samples = img.width * img.height * bands * frames
+    return {'media': 'image', 'format': img.format, 'width': img.width,
+            'height': img.height, 'bands': bands, 'frames': frames, 'samples': samples}
+
+def _frame_reader(image_path):
+    """Return a read(count) callable that decodes frames only as it reaches them."""
+    if hasattr(image_path, 'seek'):
+        image_path.seek(0)
+    img = Image.open(image_path)
+    frames = ImageSequence.Iterator(img)
+    pending = np.empty(0, dtype=np.uint8)
+
+    def read(count):
+        nonlocal pending
+        parts = []
+        wanted = count
+        while wanted > 0:
+            if len(pending) == 0:
+                try:
+                    frame = next(frames)
+                except StopIteration:
+                    break
+                with span('decode'):
+                    pending = np.asarray(_frame_image(frame)).reshape(-1)
+            parts.append(pending[:wanted])
+            pending = pending[wanted:]
+            wanted -= len(parts[-1])
+        return np.concatenate(parts) if parts else pending[:0]
+
+    return read
+
+def _chunk(fp, kind, data):
+    """Write one PNG chunk with its length and CRC."""
+    fp.write(struct.pack('>I', len(data)) + kind + data)
+    fp.write(struct.pack('>I', zlib.crc32(kind + data)))
+
+def _chunks(data):
+    """Yield (type, data) for the chunks of an encoded PNG."""
+    position = len(_PNG_SIGNATURE)
+    while position < len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        yield kind, data[position + 8:position + 8 + length]
+        position += 12 + length
+
+class ApngWriter:
+    """Write an animated PNG one frame at a time.
+
+    Each frame is compressed by Pillow's PNG encoder on its own and its
+    image data is moved into fdAT chunks, so only the current frame is held
+    in memory. Frames are written whole, replacing the canvas, which keeps
+    the composited pixels (and any LSBs in them) exactly as given, so they
+    must all have the size of the first one.
+    """
+
+    def __init__(self, fp, frames, loop=0, options=None):
+        self.fp = fp
+        self.frames = frames
+        self.loop = loop
+        self.options = options or {}
+        self.sequence = 0
+        self.written = 0
+        self.size = None
+
+    def add(self, frame, duration=0):
+        """Append a frame shown for `duration` milliseconds."""
+        if self.size is None:
+            self.size = frame.size
+        elif frame.size != self.size:
+            raise ValueError(f"Animated PNG frames must all be {self.size[0]}x{self.size[1]}")
+        encoded = io.BytesIO()
+        with span('encode'):
+            frame.save(encoded, format='PNG', **self.options)
+        delay = min(int(round(duration or 0)), 0xFFFF)
+        control = struct.pack('>IIIIIHHBB', self.sequence, frame.width, frame.height,
+                              0, 0, delay, 1000, 0, 0)
+
+        with span('write'):
+            for kind, data in _chunks(encoded.getvalue()):
+                if kind == b'IDAT':
+                    if control:
+                        _chunk(self.fp, b'fcTL', control)
+                        self.sequence += 1
+                        control = None
+                    if self.written == 0:
+                        _chunk(self.fp, b'IDAT', data)
+                    else:
+                        _chunk(self.fp, b'fdAT', struct.pack('>I', self.sequence) + data)
+                        self.sequence += 1
+                elif self.written == 0 and kind != b'IEND':
+                    # The first frame's header chunks describe the whole animation
+                    if kind == b'IHDR':
+                        self.fp.write(_PNG_SIGNATURE)
+                        _chunk(self.fp, kind, data)
+                        _chunk(self.fp, b'acTL', struct.pack('>II', self.frames, self.loop))
+                    else:
+                        _chunk(self.fp, kind, data)
+        self.written += 1
+
+    def close(self):
+        if self.written != self.frames:
+            raise ValueError(f"Animation announced {self.frames} frames but got {self.written}")
+        _chunk(self.fp, b'IEND', b'')
+
+class TiffWriter:
+    """Write a multi-page TIFF one page at a time with Pillow's appending writer."""
+
+    def __init__(self, fp, options=None):
+        self.writer = TiffImagePlugin.AppendingTiffWriter(fp, new=True)
+        self.options = options or {}
+
+    def add(self, frame, duration=0):
+        """Append a page; TIFF pages carry no duration."""
+        options = dict(self.options)
+        if 'dpi' in frame.info:
+            options['dpi'] = frame.info['dpi']
+        with span('encode'):
+            frame.save(self.writer, format='TIFF', **options)
+            self.writer.newFrame()
+
+    def close(self):
+        # newFrame() finished every page and the file belongs to the caller
+        pass
+
+def _output_format(img, output_path, format):
+    """The multi-frame format an output is written in: PNG (APNG) or TIFF."""
+    if format is None:
+        if isinstance(output_path, (str, os.PathLike)):
+            ext = os.path.splitext(output_path)[1].lower()
+            format = Image.registered_extensions().get(ext)
+            if format is None:
+                raise ValueError(f"Unsupported output format: {ext}")
+        else:
+            format = img.format or 'PNG'
+            # GIF frames are re-quantised when written, so streams get APNG
+            if format.upper() not in FRAME_FORMATS:
+                format = 'PNG'
+    if format.upper() not in FRAME_FORMATS:
+        if format.upper() in LOSSY_FORMATS + ('GIF',):
+            raise ValueError(f"{format} re-encoding would destroy the payload; "
+                             f"write an animated PNG or a multi-page TIFF")
+        raise ValueError(f"Multi-frame covers can't be written as {format}")
+    return format.upper()
+
+def hide_in_frames(image_path, message, output_path, password=None, strip_rows=None,
+                   depth=1, format=None, scatter=False, profile=DEFAULT_PROFILE,
+                   verify=False, matrix=0):
+    """Hide a message across the frames of an animation or multi-page image.
+
+    Frames are decoded, embedded and written one at a time, so memory holds
+    a single frame whatever the length of the sequence. The payload runs
+    through the frames in order and frames past its end are copied. Output
+    is an animated PNG with the cover's frame durations and loop count
+    (GIFs without a loop count play once), or
+    a multi-page TIFF; GIF covers are written as APNG, since GIF re-encoding
+    would re-quantise the colours. Palette frames are expanded to RGB(A).
+    The other arguments are those of hide_in_image; frames are embedded
+    whole, so `strip_rows` is ignored, and scattering needs random access
+    to every frame, so it is refused.
+    """
+    if not 1 <= depth <= MAX_DEPTH:
+        raise ValueError(f"Bits per sample must be between 1 and {MAX_DEPTH} for images")
+    if scatter:
+        raise ValueError("Scattered embedding is not supported for multi-frame covers")
+    if profile not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder profile: {profile}")
+    if (isinstance(image_path, (str, os.PathLike)) and isinstance(output_path, (str, os.PathLike))
+            and os.path.exists(output_path) and os.path.samefile(image_path, output_path)):
+        raise ValueError("Multi-frame covers are streamed, so the output must be a different file")
+
+    if hasattr(image_path, 'seek'):
+        image_path.seek(0)
+    img = Image.open(image_path)
+    info = probe_frames(img)
+    format = _output_format(img, output_path, format)
+    if format == 'PNG' and img.format == 'TIFF':
+        # Animated PNG frames share one canvas; reading page headers decodes nothing
+        sizes = {page.size for page in ImageSequence.Iterator(img)}
+        img.seek(0)
+        if len(sizes) > 1:
+            raise ValueError("Pages of different sizes can't be written as an animated PNG; "
+                             "write a multi-page TIFF")
+
+    # Encrypt message if password provided and wrap it in the binary header
+    data = build_payload(message, password, depth, matrix)
+    if samples_needed(len(data), depth, matrix) > info['samples']:
+        raise ValueError("Message too long for the cover file")
+    # Matrix codes start from the cover LSBs of the frames they reach
+    values, masks = payload_symbols(data, depth, _frame_reader(image_path) if matrix else None)
+    if hasattr(image_path, 'seek'):
+        image_path.seek(0)
+        img = Image.open(image_path)
+
+    # Every APNG frame shares the first frame's mode
+    mode = _frame_mode(img) if format == 'PNG' else None
+    options = ENCODER_PROFILES[profile].get(format, {})
+    fp = open(output_path, 'w+b') if isinstance(output_path, (str, os.PathLike)) else output_path
+    try:
+        if format == 'PNG':
+            writer = ApngWriter(fp, img.n_frames, img.info.get('loop', 1), options)
+        else:
+            writer = TiffWriter(fp, options)
+
+        position = 0
+        for frame in ImageSequence.Iterator(img):
+            with span('decode'):
+                duration = frame.info.get('duration', 0)
+                frame = _frame_image(frame, mode)
+            if position < len(values):
+                with span('embed'):
+                    samples = np.array(frame)
+                    end = position + samples.size
+                    embed_values(samples.reshape(-1), values[position:end], masks[position:end])
+                    frame.frombytes(samples.tobytes())
+                    position = end
+            writer.add(frame, duration)
+        writer.close()
+    finally:
+        if fp is not output_path:
+            fp.close()
+
+    if verify:
+        with span('verify'):
+            written = _frame_reader(output_path)(len(values))
+            if len(written) < len(values) or np.any((written ^ values) & masks):
+                raise ValueError("Verification failed: the written image does not hold the payload")
+
+def read_frames_payload(image_path, strip_rows=None, password=None):
+    """Read the raw payload of a multi-frame image without decrypting it.
+
+    Frames are decoded one at a time and reading stops at the last frame
+    the payload reaches. Multi-frame payloads are never scattered, so the
+    password is not needed here.
+    """
+    return read_payload(_frame_reader(image_path))
+
+def read_frames_prefix(image_path, count):
+    """Return the first `count` samples of a multi-frame image, decoding as few frames as possible."""
+    return _frame_reader(image_path)(count)
+
+def extract_from_frames(image_path, password=None, strip_rows=None,
+                        max_size=MAX_MESSAGE_SIZE):
+    """Extract a hidden message from a multi-frame image."""
+    payload = read_frames_payload(image_path, strip_rows, password)
+
+    # Decrypt message if password provided
+    return decode_payload(payload, password, max_size)
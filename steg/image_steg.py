@@ -1,79 +1,237 @@
+import os
 from PIL import Image
 import numpy as np
-from .crypto import encrypt_message, decrypt_message
-
-def hide_in_image(image_path, message, output_path, password=None):
-    """Hide a message in an image using LSB steganography."""
-    img = Image.open(image_path)
-    img_array = np.array(img)
-    
-    # Encrypt message if password provided
-    if password:
-        message = encrypt_message(message, password)
-    
-    # Add delimiter to mark end of message
-    message += "###END###"
-    
-    # Convert message to binary
-    binary_message = ''.join(format(ord(char), '08b') for char in message)
-    
-    # Flatten image array for easier manipulation
-    flat_img = img_array.flatten()
-    
-    # Hide message in LSBs
-    for i, bit in enumerate(binary_message):
-        flat_img[i] = (flat_img[i] & 0xFE) | int(bit)
-    
-    # Reshape back to original dimensions
-    modified_img = flat_img.reshape(img_array.shape)
-    
-    # Save the modified image
-    result_img = Image.fromarray(modified_img.astype(np.uint8))
-    result_img.save(output_path)
-
-def extract_from_image(image_path, password=None):
+from .bitcodec import embed_values, array_reader
+from .payload import build_payload, payload_symbols, read_payload, decode_payload, samples_needed
+from .compression import MAX_MESSAGE_SIZE
+from .profiling import span
+from .scatter import permutation_for, embed_scattered, scatter_reader
+
+# Rows processed per band; bounds the working copies whatever the image area
+STRIP_ROWS = 256
+
+# Most bits per 8-bit channel value before the change becomes visible
+MAX_DEPTH = 4
+
+# Encoder settings per output format for each profile. `fast` trades file
+# size for speed (zlib level 1 with run-length matching, uncompressed TIFF),
+# `balanced` is Pillow's default and `small` spends time on the smallest file
+ENCODER_PROFILES = {
+    'fast': {'PNG': {'compress_level': 1, 'compress_type': 3}, 'TIFF': {'compression': 'raw'}},
+    'balanced': {'PNG': {'compress_level': 6}, 'TIFF': {'compression': 'tiff_lzw'}},
+    'small': {'PNG': {'compress_level': 9, 'optimize': True},
+              'TIFF': {'compression': 'tiff_adobe_deflate'}},
+}
+DEFAULT_PROFILE = 'balanced'
+
+# Formats whose re-encoding destroys LSBs; covers in them are saved as PNG
+LOSSY_FORMATS = ('JPEG', 'MPO', 'WEBP')
+
+def _truncate_rows(img, rows):
+    """Limit a lazily opened image to its first rows so only those get decoded.
+
+    Works for formats whose data is a single row-sequential tile, such as
+    non-interlaced PNG and uncompressed top-down TIFF. Returns False when
+    the whole image has to be decoded.
+    """
+    if rows >= img.height or len(img.tile) != 1 or img.info.get('interlace'):
+        return False
+
+    tile = img.tile[0]
+    codec, extents, args = tile[0], tile[1], tile[3]
+    if extents != (0, 0, img.width, img.height):
+        return False
+    # Raw tiles carry (rawmode, stride, orientation); bottom-up rows are out
+    if codec == 'raw' and not (isinstance(args, tuple) and len(args) == 3 and args[2] == 1):
+        return False
+    if codec not in ('zip', 'raw'):
+        return False
+
+    img._size = (img.width, rows)
+    img.tile = [tile[:1] + ((0, 0, img.width, rows),) + tuple(tile[2:])]
+    return True
+
+def _open(image):
+    """Open an image path or binary file object lazily, from its first byte."""
+    if hasattr(image, 'seek'):
+        image.seek(0)
+    return Image.open(image)
+
+def _decode_rows(image_path, rows):
+    """Decode at least the first `rows` rows of an image as a flat sample array."""
+    with span('decode'):
+        img = _open(image_path)
+        _truncate_rows(img, rows)
+        return np.asarray(img).reshape(-1)
+
+def _row_reader(image_path, strip_rows):
+    """Return a read(count) callable that decodes only the rows it reaches."""
+    img = _open(image_path)
+    height = img.height
+    row_samples = img.width * len(img.getbands())
+    samples = np.empty(0, dtype=np.uint8)
+    position = 0
+
+    def read(count):
+        nonlocal samples, position
+        end = position + count
+        decoded_rows = len(samples) // row_samples
+        if end > len(samples) and decoded_rows < height:
+            # Grow the decoded prefix geometrically so re-decoding stays linear
+            rows = max(-(-end // row_samples), 2 * decoded_rows, strip_rows)
+            samples = _decode_rows(image_path, min(rows, height))
+        chunk = samples[position:end]
+        position += len(chunk)
+        return chunk
+
+    return read
+
+def _output_format(img, output_path, format):
+    """The lossless format an output is written in."""
+    if format is None:
+        if isinstance(output_path, (str, os.PathLike)):
+            ext = os.path.splitext(output_path)[1].lower()
+            format = Image.registered_extensions().get(ext)
+            if format is None:
+                raise ValueError(f"Unsupported output format: {ext}")
+        else:
+            format = img.format or 'PNG'
+            # Lossy covers go to a lossless container when written to a stream
+            if format.upper() in LOSSY_FORMATS:
+                format = 'PNG'
+    if format.upper() in LOSSY_FORMATS:
+        raise ValueError(f"{format} re-encoding would destroy the payload; "
+                         f"write a lossless format such as PNG")
+    return format.upper()
+
+def _verify(output_path, values, masks, password=None, scatter=False):
+    """Check that a written image holds the payload, decoding only the rows it covers."""
+    with span('verify'):
+        if scatter:
+            samples = _decode_rows(output_path, _open(output_path).height)
+            written = samples[permutation_for(password, samples.size).take(0, len(values))]
+        else:
+            written = _row_reader(output_path, STRIP_ROWS)(len(values))
+        if len(written) < len(values) or np.any((written ^ values) & masks):
+            raise ValueError("Verification failed: the written image does not hold the payload")
+
+def hide_in_image(image_path, message, output_path, password=None,
+                  strip_rows=STRIP_ROWS, depth=1, format=None, scatter=False,
+                  profile=DEFAULT_PROFILE, verify=False, matrix=0):
+    """Hide a message in an image using LSB steganography.
+
+    `image_path` and `output_path` may also be binary file objects; file
+    outputs are written in `format`, by default the format of the cover,
+    with the encoder settings of `profile` (see ENCODER_PROFILES). Lossy
+    formats are refused for path outputs and replaced by PNG for file
+    objects. `depth` is the number of low bits used per channel value
+    (1-4). Only the row bands the payload covers are copied out, modified
+    and pasted back, `strip_rows` rows at a time. With `scatter`, samples
+    are visited in an order keyed by the password instead of from the
+    first pixel. With `verify`, the written image is read back as far as
+    the payload reaches; file object outputs must then be readable.
+    A nonzero `matrix` hides p bits in each block of 2^p - 1 samples with
+    a Hamming code, changing at most one of them (depth must be 1).
+    """
+    if not 1 <= depth <= MAX_DEPTH:
+        raise ValueError(f"Bits per sample must be between 1 and {MAX_DEPTH} for images")
+    if scatter and not password:
+        raise ValueError("Scattered embedding needs a password")
+    if profile not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder profile: {profile}")
+
+    with span('decode'):
+        img = _open(image_path)
+    if getattr(img, 'n_frames', 1) > 1:
+        # Animations and multi-page files are streamed frame by frame
+        from .frames_steg import hide_in_frames
+        return hide_in_frames(image_path, message, output_path, password, strip_rows, depth,
+                              format, scatter, profile, verify, matrix)
+    with span('decode'):
+        img.load()
+
+    # Encrypt message if password provided and wrap it in the binary header
+    data = build_payload(message, password, depth, matrix)
+
+    row_samples = img.width * len(img.getbands())
+    if samples_needed(len(data), depth, matrix) > row_samples * img.height:
+        raise ValueError("Message too long for the cover file")
+
+    if scatter:
+        # Payload positions span the whole image, so work on one full copy
+        samples = np.array(img)
+        permutation = permutation_for(password, samples.size)
+        values, masks = payload_symbols(data, depth, scatter_reader(samples.reshape(-1), permutation))
+        with span('embed'):
+            embed_scattered(samples.reshape(-1), values, masks, permutation)
+            # Raw TIFF and BMP covers are memory-mapped read-only and frombytes
+            # writes straight into the image memory
+            if img.readonly:
+                img = img.copy()
+            img.frombytes(samples.tobytes())
+    else:
+        cover = None
+        if matrix:
+            # Matrix codes start from the cover LSBs of the rows they reach
+            rows = -(-samples_needed(len(data), depth, matrix) // row_samples)
+            cover = array_reader(np.asarray(img.crop((0, 0, img.width, rows))).reshape(-1))
+        values, masks = payload_symbols(data, depth, cover)
+        with span('embed'):
+            # Hide payload in LSBs, one band of rows at a time
+            position = 0
+            top = 0
+            while position < len(values):
+                box = (0, top, img.width, min(top + strip_rows, img.height))
+                strip = img.crop(box)
+                band = np.array(strip)
+                end = position + band.size
+                embed_values(band.reshape(-1), values[position:end], masks[position:end])
+                strip.frombytes(band.tobytes())
+                img.paste(strip, box)
+                position = end
+                top += strip_rows
+
+    # Save the modified image; Pillow encodes and writes in one call
+    format = _output_format(img, output_path, format)
+    with span('encode'):
+        img.save(output_path, format=format, **ENCODER_PROFILES[profile].get(format, {}))
+
+    if verify:
+        _verify(output_path, values, masks, password, scatter)
+
+def read_image_payload(image_path, strip_rows=STRIP_ROWS, password=None):
+    """Read the raw payload of an image or binary file object without decrypting it.
+
+    With a password, a cover without a sequential header is also tried in
+    the password's scattered order. Multi-frame covers are read by
+    steg.frames_steg.
+    """
+    if getattr(_open(image_path), 'n_frames', 1) > 1:
+        from .frames_steg import read_frames_payload
+        return read_frames_payload(image_path, strip_rows, password)
+
+    def scattered():
+        samples = _decode_rows(image_path, _open(image_path).height)
+        return scatter_reader(samples, permutation_for(password, samples.size))
+
+    # Read the header, then decode only the rows holding the payload
+    return read_payload(_row_reader(image_path, strip_rows), scattered if password else None)
+
+def read_image_prefix(image_path, count):
+    """Return the first `count` samples of an image, decoding as few rows as possible.
+
+    JPEG and other lossy covers return no samples: outputs are always
+    lossless, so they can't hold a payload, and their rows can't be
+    decoded without decoding the whole image.
+    """
+    if _open(image_path).format in LOSSY_FORMATS:
+        return np.empty(0, dtype=np.uint8)
+    return _row_reader(image_path, 1)(count)
+
+def extract_from_image(image_path, password=None, strip_rows=STRIP_ROWS,
+                       max_size=MAX_MESSAGE_SIZE):
     """Extract a hidden message from an image."""
-    img = Image.open(image_path)
-    img_array = np.array(img)
-    
-    # Flatten image array
-    flat_img = img_array.flatten()
-    
-    # Extract LSBs
-    binary_message = ""
-    for pixel in flat_img:
-        binary_message += str(pixel & 1)
-    
-    # Convert binary to text
-    message = ""
-    for i in range(0, len(binary_message), 8):
-        byte = binary_message[i:i+8]
-        if len(byte) == 8:
-            try:
-                char = chr(int(byte, 2))
-                message += char
-                
-                # Check for end delimiter
-                if message.endswith("###END###"):
-                    message = message[:-9]  # Remove delimiter
-                    break
-            except ValueError:
-                continue
-    
-    if not message or not message.endswith("###END###") and "###END###" not in message:
-        # Try to find any valid message
-        if len(message) < 10:  # Too short to be meaningful
-            return None
-    
-    # Clean message if delimiter found
-    if "###END###" in message:
-        message = message.split("###END###")[0]
-    
+    payload = read_image_payload(image_path, strip_rows, password)
+
     # Decrypt message if password provided
-    if password and message:
-        try:
-            message = decrypt_message(message, password)
-        except:
-            return None
-    
-    return message if message else None
\ No newline at end of file
+    return decode_payload(payload, password, max_size)
@@ -0,0 +1,291 @@
+import base64
+import struct
+from collections import namedtuple
+import numpy as np
+from .compression import FLAG_COMPRESSED, MAX_MESSAGE_SIZE, compress, decompress
+from .profiling import span
+from .bitcodec import (SCAN_CHUNK_BYTES, text_to_bytes, bytes_to_text,
+                       bytes_to_bits, bits_to_values, extract_bytes,
+                       extract_until, matrix_embed, extract_matrix_bytes)
+
+# Binary container written in front of every payload: magic, format
+# version, flags, bits per sample of the body, the matrix code parameter
+# and the body length in bytes. The header itself always uses one bit per
+# sample.
+MAGIC = b"GVLT"
+VERSION = 1
+_HEADER = struct.Struct(">4sBBBBI")
+HEADER_SIZE = _HEADER.size
+HEADER_BITS = HEADER_SIZE * 8
+
+# Bodies hidden with a (1, 2^p - 1, p) Hamming code carry p in the byte
+# that used to be reserved, and this version so older readers skip them
+MATRIX_VERSION = 2
+MAX_MATRIX = 8
+
+# Bit 0 marks encryption; bits 1-3 name the compression codec
+FLAG_ENCRYPTED = 0x01
+
+# Terminator used by covers written before the binary header existed
+LEGACY_DELIMITER = b"###END###"
+
+Payload = namedtuple('Payload', ['flags', 'data', 'legacy'])
+
+# Cover samples a probe reads: the header plus the start of a legacy message
+PROBE_SAMPLES = 512
+
+# What a probe of the first cover samples tells about a payload
+Probe = namedtuple('Probe', ['kind', 'flags', 'depth', 'length', 'matrix'], defaults=[0])
+
+
+def pack_header(flags, length, depth=1, matrix=0):
+    """Build the binary header for a payload body of `length` bytes."""
+    return _HEADER.pack(MAGIC, MATRIX_VERSION if matrix else VERSION, flags, depth, matrix, length)
+
+
+def parse_header(data):
+    """Parse a binary header, returning (flags, depth, length, matrix) or None.
+
+    `matrix` is the Hamming code parameter p of the body, 0 for plain LSBs.
+    """
+    if len(data) < HEADER_SIZE:
+        return None
+    magic, version, flags, depth, matrix, length = _HEADER.unpack(data[:HEADER_SIZE])
+    if magic != MAGIC or version not in (VERSION, MATRIX_VERSION) or depth > 8:
+        return None
+    if version == VERSION:
+        matrix = 0
+    elif not 2 <= matrix <= MAX_MATRIX:
+        return None
+    # Headers written before the depth field existed hold zero there
+    return flags, max(depth, 1), length, matrix
+
+
+def check_matrix(matrix, depth=1):
+    """Reject matrix parameters the header and codec can't carry."""
+    if matrix and not 2 <= matrix <= MAX_MATRIX:
+        raise ValueError(f"Matrix code parameter must be between 2 and {MAX_MATRIX}")
+    if matrix and depth != 1:
+        raise ValueError("Matrix embedding uses one bit per sample")
+
+
+def _message_bytes(message):
+    """Messages are text, or raw bytes for binary payloads."""
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        return bytes(message)
+    return text_to_bytes(message)
+
+
+def build_payload(message, password=None, depth=1, matrix=0):
+    """Turn a message into the header plus body bytes to embed.
+
+    The message is compressed with the best stdlib codec, when that helps,
+    before it is encrypted. A nonzero `matrix` marks the body for Hamming
+    matrix embedding with that code parameter.
+    """
+    check_matrix(matrix, depth)
+    with span('compress'):
+        flags, body = compress(_message_bytes(message))
+    if password:
+        # cryptography is only imported once a password is involved
+        from .crypto import encrypt_bytes
+        body = encrypt_bytes(body, password)
+        flags |= FLAG_ENCRYPTED
+    return pack_header(flags, len(body), depth, matrix) + body
+
+
+def payload_size(message, password=None):
+    """Number of bytes build_payload will produce for a message."""
+    length = len(compress(_message_bytes(message))[1])
+    if password:
+        from .crypto import encryption_overhead
+        length += encryption_overhead(password)
+    return HEADER_SIZE + length
+
+
+def samples_needed(size, depth=1, matrix=0):
+    """Number of cover samples a payload of `size` bytes touches at `depth`.
+
+    With a `matrix` code parameter p, every p body bits take a block of
+    2^p - 1 samples instead.
+    """
+    if matrix:
+        return HEADER_BITS + -(-(size - HEADER_SIZE) * 8 // matrix) * ((1 << matrix) - 1)
+    return HEADER_BITS + -(-(size - HEADER_SIZE) * 8 // depth)
+
+
+def payload_capacity(samples, depth=1, matrix=0):
+    """Largest payload in bytes, header included, that `samples` samples hold.
+
+    The inverse of samples_needed for the same `depth` or `matrix` mode.
+    """
+    if samples < HEADER_BITS:
+        return 0
+    # Header at one bit per sample, body at `depth` bits per sample or p bits per block
+    if matrix:
+        return HEADER_SIZE + (samples - HEADER_BITS) // ((1 << matrix) - 1) * matrix // 8
+    return HEADER_SIZE + (samples - HEADER_BITS) * depth // 8
+
+
+def payload_symbols(data, depth=1, read_cover=None):
+    """Split a built payload into the value and bit mask of each touched sample.
+
+    The header goes one bit per sample so extractors can read it before
+    they know the depth; the body uses `depth` bits per sample. Payloads
+    built for matrix embedding depend on the cover: `read_cover(count)`
+    must return its samples in embedding order, as the readers given to
+    read_payload do, and the body values are the cover LSBs with at most
+    one flipped per block.
+    """
+    matrix = parse_header(data)[3]
+    with span('bitpack'):
+        header = bytes_to_bits(data[:HEADER_SIZE])
+        if matrix:
+            if read_cover is None:
+                raise ValueError("Matrix embedding needs the cover samples")
+            read_cover(HEADER_BITS)
+            cover = read_cover(samples_needed(len(data), 1, matrix) - HEADER_BITS)
+            body = matrix_embed(cover, bytes_to_bits(data[HEADER_SIZE:]), matrix)
+            if body is None:
+                raise ValueError("Message too long for the cover file")
+            depth = 1
+        else:
+            body = bits_to_values(bytes_to_bits(data[HEADER_SIZE:]), depth)
+        values = np.concatenate([header, body])
+        masks = np.full(len(values), (1 << depth) - 1, dtype=np.uint8)
+        masks[:HEADER_BITS] = 1
+    return values, masks
+
+
+def _read_matrix_body(read_samples, flags, length, matrix):
+    """Read a body hidden with a Hamming code from the syndromes of its blocks."""
+    # Whole chunks must end on a block boundary: a multiple of p bytes
+    chunk_bytes = SCAN_CHUNK_BYTES // matrix * matrix
+    block = (1 << matrix) - 1
+    body = bytearray()
+    while len(body) < length:
+        count = min(length - len(body), chunk_bytes)
+        samples = read_samples(-(-count * 8 // matrix) * block)
+        with span('extract'):
+            chunk = extract_matrix_bytes(samples, count, matrix)
+        if len(chunk) < count:
+            break
+        body += chunk
+    if len(body) == length:
+        return Payload(flags, bytes(body), False)
+    return None
+
+
+def _read_body(read_samples, header):
+    """Read the body a parsed header announces, or None if the cover ends first."""
+    flags, depth, length, matrix = header
+    if matrix:
+        return _read_matrix_body(read_samples, flags, length, matrix)
+    # Whole chunks must end on a sample boundary at this depth
+    chunk_bytes = SCAN_CHUNK_BYTES // depth * depth
+    body = bytearray()
+    while len(body) < length:
+        count = min(length - len(body), chunk_bytes)
+        samples = read_samples(-(-count * 8 // depth))
+        with span('extract'):
+            chunk = extract_bytes(samples, count, depth=depth)
+        if not chunk:
+            break
+        body += chunk
+    if len(body) == length:
+        return Payload(flags, bytes(body), False)
+    return None
+
+
+def _read_header(read_samples):
+    """Decode the header bits a reader yields first."""
+    samples = read_samples(HEADER_BITS)
+    with span('extract'):
+        prefix = extract_bytes(samples, HEADER_SIZE)
+    return prefix, parse_header(prefix)
+
+
+def read_payload(read_samples, scattered=None):
+    """Read a payload from the LSBs of a cover.
+
+    `read_samples(count)` returns the next `count` samples of the cover in
+    embedding order. Only the header and the body it announces are decoded.
+    When there is no header in sequential order, `scattered()`, if given,
+    returns a reader in keyed scattered order to look for one there;
+    covers written with the old text delimiter are scanned for it last.
+    """
+    prefix, header = _read_header(read_samples)
+    if header:
+        return _read_body(read_samples, header)
+
+    if scattered is not None:
+        read_scattered = scattered()
+        header = _read_header(read_scattered)[1]
+        if header:
+            return _read_body(read_scattered, header)
+
+    data = extract_until(read_samples, LEGACY_DELIMITER, prefix)
+    if data:
+        return Payload(0, data, True)
+    return None
+
+
+def probe_payload(samples):
+    """Identify a payload from the first cover samples without reading its body.
+
+    Returns a Probe of kind 'header' or 'legacy', or None. Legacy covers
+    are only recognised when their delimiter lies inside the samples.
+    """
+    with span('extract'):
+        prefix = extract_bytes(samples, len(samples) // 8)
+    header = parse_header(prefix)
+    if header:
+        flags, depth, length, matrix = header
+        return Probe('header', flags, depth, length, matrix)
+    end = prefix.find(LEGACY_DELIMITER)
+    if end > 0:
+        return Probe('legacy', 0, 1, end)
+    return None
+
+
+def decode_payload_bytes(payload, password=None, max_size=MAX_MESSAGE_SIZE):
+    """Turn an extracted payload into its message bytes, or None.
+
+    Encrypted payloads need the password. Compressed messages larger than
+    `max_size` bytes raise ValueError.
+    """
+    if payload is None or not payload.data:
+        return None
+
+    # Legacy covers carry no flags, so trust the caller's password
+    encrypted = payload.legacy or payload.flags & FLAG_ENCRYPTED
+    data = payload.data
+    if password and encrypted:
+        from .crypto import decrypt_bytes
+        try:
+            data = decrypt_bytes(data, password)
+        except ValueError:
+            return None
+    elif encrypted and not payload.legacy:
+        return None
+
+    if payload.flags & FLAG_COMPRESSED:
+        with span('decompress'):
+            data = decompress(payload.flags, data, max_size)
+    return data
+
+
+def decode_payload(payload, password=None, max_size=MAX_MESSAGE_SIZE):
+    """Turn an extracted payload into its message text, or None.
+
+    Without a password, encrypted payloads are returned as base64 text.
+    Compressed messages larger than `max_size` bytes raise ValueError.
+    """
+    if payload is None or not payload.data:
+        return None
+    if not password and payload.flags & FLAG_ENCRYPTED and not payload.legacy:
+        return base64.b64encode(payload.data).decode('ascii')
+
+    data = decode_payload_bytes(payload, password, max_size)
+    message = bytes_to_text(data) if data else None
+    return message if message else None
@@ -0,0 +1,135 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+# Active recorder, or None when profiling is off
+_recorder = None
+
+# Callables handed every finished recording, e.g. to forward to metrics
+_sinks = []
+
+# Shared no-op context returned by span() while profiling is off
+_NULL_SPAN = nullcontext()
+
+
+class Recorder:
+    """Accumulates the time spent in each named stage."""
+
+    def __init__(self):
+        self.stages = {}
+        self.started = time.perf_counter()
+        self.total = None
+
+    def add(self, name, seconds):
+        """Add one timed span to its stage."""
+        entry = self.stages.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def as_dict(self):
+        """Timings as plain data, ready for JSON or a metrics pipeline."""
+        total = self.total if self.total is not None else time.perf_counter() - self.started
+        return {
+            'total_seconds': total,
+            'stages': {name: {'seconds': seconds, 'count': count}
+                       for name, (seconds, count) in self.stages.items()},
+        }
+
+    def report(self):
+        """Human readable stage breakdown, slowest stage first."""
+        data = self.as_dict()
+        total = data['total_seconds']
+        lines = [f"{'stage':<12} {'ms':>10} {'calls':>7} {'share':>7}"]
+        ordered = sorted(data['stages'].items(), key=lambda item: -item[1]['seconds'])
+        for name, stage in ordered:
+            share = stage['seconds'] / total * 100 if total else 0.0
+            lines.append(f"{name:<12} {stage['seconds'] * 1000:>10.2f} {stage['count']:>7} {share:>6.1f}%")
+        lines.append(f"{'total':<12} {total * 1000:>10.2f}")
+        return '\n'.join(lines)
+
+    def to_json(self):
+        """Timings as a JSON string."""
+        return json.dumps(self.as_dict())
+
+
+class _Span:
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def span(name):
+    """Context manager timing a stage; a shared no-op while profiling is off."""
+    if _recorder is None:
+        return _NULL_SPAN
+    return _Span(_recorder, name)
+
+
+def add_sink(sink):
+    """Register a callable that receives the timings dict of every recording."""
+    _sinks.append(sink)
+
+
+@contextmanager
+def recording():
+    """Record stage spans for the duration of the block."""
+    global _recorder
+    previous = _recorder
+    recorder = _recorder = Recorder()
+    try:
+        yield recorder
+    finally:
+        recorder.total = time.perf_counter() - recorder.started
+        _recorder = previous
+        for sink in _sinks:
+            sink(recorder.as_dict())
+
+
+@contextmanager
+def capture(tool, output_path=None):
+    """Run the block under cProfile or pyinstrument.
+
+    cProfile statistics are dumped to `output_path` when given, otherwise
+    printed; pyinstrument writes its text report the same way.
+    """
+    if tool == 'cprofile':
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            if output_path:
+                profiler.dump_stats(output_path)
+            else:
+                pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+    elif tool == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ValueError("pyinstrument is not installed. Install with: pip install pyinstrument")
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            if output_path:
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_text())
+            else:
+                print(profiler.output_text())
+    else:
+        raise ValueError(f"Unknown profiler: {tool}")
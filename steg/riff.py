@@ -0,0 +1,75 @@
+import struct
+from collections import namedtuple
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Location of the sample data inside a WAV file and how it is laid out
+WavLayout = namedtuple('WavLayout', ['data_offset', 'data_size', 'channels',
+                                     'sample_width', 'frame_rate'])
+
+
+def read_chunks(f):
+    """Return {chunk_id: (offset, size)} for the chunks of an open RIFF/WAVE file."""
+    f.seek(0)
+    riff, _, form = struct.unpack('<4sI4s', f.read(12))
+    if riff != b'RIFF' or form != b'WAVE':
+        raise ValueError("Not a RIFF/WAVE file")
+
+    chunks = {}
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            break
+        chunk_id, size = struct.unpack('<4sI', head)
+        offset = f.tell()
+        chunks.setdefault(chunk_id, (offset, size))
+        # Chunks are padded to an even number of bytes
+        f.seek(offset + size + (size & 1))
+    return chunks
+
+
+def read_layout(f):
+    """Parse the chunk table of an open WAV file and locate its PCM data."""
+    chunks = read_chunks(f)
+    if b'fmt ' not in chunks or b'data' not in chunks:
+        raise ValueError("WAV file is missing its fmt or data chunk")
+
+    offset, size = chunks[b'fmt ']
+    f.seek(offset)
+    fmt_tag, channels, frame_rate, _, block_align, _ = struct.unpack('<HHIIHH', f.read(16))
+    if fmt_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE):
+        raise ValueError("Only uncompressed PCM WAV files are supported")
+
+    data_offset, data_size = chunks[b'data']
+    # Writers that stream audio may leave a placeholder size behind
+    f.seek(0, 2)
+    data_size = min(data_size, f.tell() - data_offset)
+    return WavLayout(data_offset, data_size, channels, block_align // channels, frame_rate)
+
+
+class _BufferFile:
+    """Read/seek/tell over a bytes-like object without copying it."""
+
+    def __init__(self, buffer):
+        self.view = memoryview(buffer).cast('B')
+        self.position = 0
+
+    def read(self, size=-1):
+        end = len(self.view) if size < 0 else self.position + size
+        data = bytes(self.view[self.position:end])
+        self.position += len(data)
+        return data
+
+    def seek(self, offset, whence=0):
+        base = {0: 0, 1: self.position, 2: len(self.view)}[whence]
+        self.position = base + offset
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+def buffer_layout(buffer):
+    """Locate the PCM data of a WAV file held in memory."""
+    return read_layout(_BufferFile(buffer))
@@ -0,0 +1,89 @@
+import hashlib
+import numpy as np
+
+# Feistel rounds of the keyed index permutation
+ROUNDS = 6
+
+# Cover positions computed per vectorised batch while embedding
+BATCH = 1 << 16
+
+# Odd 64-bit multipliers of the round function (splitmix64 finaliser)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+class Permutation:
+    """Keyed bijection of [0, size), evaluated only at the indices asked for.
+
+    A balanced Feistel network over the smallest even bit width covering
+    `size` permutes that power-of-two domain. Indices landing outside
+    [0, size) go through the network again (cycle walking) until they fall
+    inside, which keeps the mapping a bijection of [0, size) while never
+    materialising more than the requested indices.
+    """
+
+    def __init__(self, key, size):
+        self.size = size
+        self.half_bits = np.uint64(max(1, -(-max(size - 1, 1).bit_length() // 2)))
+        self.mask = np.uint64((1 << int(self.half_bits)) - 1)
+        digest = hashlib.blake2b(key, digest_size=8 * ROUNDS, person=b'gv-scatter').digest()
+        self.keys = np.frombuffer(digest, dtype='>u8').astype(np.uint64)
+
+    def _round(self, right, key):
+        mixed = (right ^ key) * _MIX1
+        mixed ^= mixed >> np.uint64(31)
+        mixed *= _MIX2
+        mixed ^= mixed >> np.uint64(29)
+        return mixed & self.mask
+
+    def _encrypt(self, indices):
+        left = indices >> self.half_bits
+        right = indices & self.mask
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half_bits) | right
+
+    def __call__(self, indices):
+        """Map an array of indices in [0, size) to their positions."""
+        positions = self._encrypt(np.asarray(indices, dtype=np.uint64))
+        outside = np.flatnonzero(positions >= self.size)
+        while len(outside):
+            positions[outside] = self._encrypt(positions[outside])
+            outside = outside[positions[outside] >= self.size]
+        return positions.astype(np.int64)
+
+    def take(self, start, count):
+        """Positions of the indices start .. start + count - 1."""
+        return self(np.arange(start, start + count, dtype=np.uint64))
+
+
+def permutation_for(password, size):
+    """The scattering order a password gives a cover of `size` samples."""
+    from .crypto import scatter_key
+    return Permutation(scatter_key(password), size)
+
+
+def embed_scattered(samples, values, masks, permutation):
+    """Write values into the masked low bits of samples at permuted positions."""
+    if len(values) > permutation.size:
+        raise ValueError("Message too long for the cover file")
+    for start in range(0, len(values), BATCH):
+        end = min(start + BATCH, len(values))
+        positions = permutation.take(start, end - start)
+        region = samples[positions]
+        region ^= (region ^ values[start:end].astype(region.dtype)) & masks[start:end].astype(region.dtype)
+        samples[positions] = region
+
+
+def scatter_reader(samples, permutation):
+    """Return a read(count) callable gathering samples in permuted order."""
+    position = 0
+
+    def read(count):
+        nonlocal position
+        count = max(0, min(count, permutation.size - position))
+        chunk = samples[permutation.take(position, count)]
+        position += count
+        return chunk
+
+    return read
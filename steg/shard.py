@@ -0,0 +1,43 @@
+import struct
+import zlib
+from collections import namedtuple
+
+# Shard messages start with their own header: magic, version, set id,
+# shard index and count, offset of the shard in the whole payload, size of
+# the whole payload, CRC-32 of the shard data and SHA-256 of the whole payload
+SHARD_MAGIC = b"GVSH"
+SHARD_VERSION = 1
+_SHARD_HEADER = struct.Struct(">4sB16sIIQQI32s")
+SHARD_HEADER_SIZE = _SHARD_HEADER.size
+
+ShardHeader = namedtuple('ShardHeader', ['set_id', 'index', 'count', 'offset',
+                                         'total_size', 'digest'])
+
+
+def pack_shard(header, data):
+    """Prefix one slice of a split payload with its shard header."""
+    return _SHARD_HEADER.pack(SHARD_MAGIC, SHARD_VERSION, header.set_id, header.index,
+                              header.count, header.offset, header.total_size,
+                              zlib.crc32(data), header.digest) + data
+
+
+def is_shard(message):
+    """Whether extracted message bytes are a shard of a split payload."""
+    return message[:len(SHARD_MAGIC)] == SHARD_MAGIC
+
+
+def parse_shard(message):
+    """Split extracted message bytes into (ShardHeader, data).
+
+    Raises ValueError when the bytes are not a shard or its data is corrupt.
+    """
+    if len(message) < SHARD_HEADER_SIZE or not is_shard(message):
+        raise ValueError("Not a shard of a split payload")
+    _, version, set_id, index, count, offset, total_size, crc, digest = \
+        _SHARD_HEADER.unpack_from(message)
+    if version != SHARD_VERSION:
+        raise ValueError(f"Unsupported shard version: {version}")
+    data = message[SHARD_HEADER_SIZE:]
+    if zlib.crc32(data) != crc:
+        raise ValueError(f"Shard {index} failed its checksum")
+    return ShardHeader(set_id, index, count, offset, total_size, digest), data
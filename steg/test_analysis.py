@@ -0,0 +1,31 @@
+"""Estimates of steg.analysis on clean and embedded covers."""
+
+import numpy as np
+from .analysis import analyze_samples
+from .vault import Vault
+
+
+def _cover(seed=0):
+    # A noisy gradient, smooth enough for RS analysis to tell LSB flips apart
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:512, 0:512]
+    gray = ((x + y) / 4 + rng.normal(0, 3, (512, 512))).clip(0, 255).astype(np.uint8)
+    return np.repeat(gray[:, :, None], 3, axis=2).reshape(-1)
+
+
+def test_clean_and_embedded_covers():
+    cover = _cover()
+    assert not analyze_samples(cover, 3)['suspect']
+
+    message = np.random.default_rng(1).bytes(cover.size // 8 * 95 // 100)
+    for vault in (Vault(), Vault(password="pw", scatter=True)):
+        result = analyze_samples(vault.hide(cover, message), 3)
+        # RS analysis has no estimate for fully embedded covers; the chi-square rate stands in
+        assert result['suspect'] and result['embedding_rate'] > 0.9
+
+
+def test_wide_samples_are_not_analysed():
+    samples = np.random.default_rng(0).integers(0, 1 << 16, 40000, dtype=np.uint16)
+    result = analyze_samples(samples, 2)
+    assert result['embedding_rate'] is None and result['suspect'] is None
+    assert result['sample_bits'] == 16
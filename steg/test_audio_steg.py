@@ -0,0 +1,82 @@
+"""File round trips through steg.audio_steg."""
+
+import io
+import struct
+import numpy as np
+import pytest
+from .audio_steg import hide_in_audio, extract_from_audio, read_audio_payload
+from .riff import WAVE_FORMAT_EXTENSIBLE
+from utils.validator import check_capacity, cover_info
+
+# KSDATAFORMAT_SUBTYPE_PCM
+_PCM_GUID = bytes.fromhex('0100000000001000800000aa00389b71')
+
+
+def write_wav(path, frames=4000, channels=2, width=2, extensible=False, trailer=b'', seed=0):
+    """Write random PCM as a plain or WAVE_FORMAT_EXTENSIBLE file, built chunk by chunk."""
+    data = np.random.default_rng(seed).integers(0, 256, frames * channels * width, dtype=np.uint8).tobytes()
+    rate = 48000
+    fmt = struct.pack('<HHIIHH', WAVE_FORMAT_EXTENSIBLE if extensible else 1, channels, rate,
+                      rate * channels * width, channels * width, width * 8)
+    if extensible:
+        # Channel mask 0x3F is 5.1: FL, FR, FC, LFE, BL, BR
+        fmt += struct.pack('<HHI', 22, width * 8, 0x3F) + _PCM_GUID
+    chunks = (b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+              + b'data' + struct.pack('<I', len(data)) + data + trailer)
+    with open(path, 'wb') as f:
+        f.write(b'RIFF' + struct.pack('<I', 4 + len(chunks)) + b'WAVE' + chunks)
+    return str(path)
+
+
+@pytest.mark.parametrize('options', [{}, {'inplace': True}, {'matrix': 3},
+                                     {'channels': [1, 4]}, {'password': 'pw', 'scatter': True}])
+def test_extensible_24_bit_six_channels(tmp_path, options):
+    cover = write_wav(tmp_path / 'surround.wav', channels=6, width=3, extensible=True)
+    assert cover_info(cover)['samples'] == 4000 * 6
+    assert check_capacity(cover, "surround sound")
+
+    output = str(tmp_path / 'out.wav')
+    hide_in_audio(cover, "surround sound", output, **options)
+    assert extract_from_audio(output, password=options.get('password'),
+                              channels=options.get('channels')) == "surround sound"
+
+
+def test_stream_keeps_other_chunks_and_upper_bytes(tmp_path):
+    trailer = b'LIST' + struct.pack('<I', 6) + b'INFOab'
+    cover = write_wav(tmp_path / 'cover.wav', width=3, trailer=trailer)
+    output = str(tmp_path / 'out.wav')
+    hide_in_audio(cover, "kept", output, block_frames=512)
+
+    before, after = open(cover, 'rb').read(), open(output, 'rb').read()
+    assert len(before) == len(after) and after.endswith(trailer)
+    samples = np.frombuffer(before[44:-len(trailer)], np.uint8).reshape(-1, 3)
+    stego = np.frombuffer(after[44:-len(trailer)], np.uint8).reshape(-1, 3)
+    # Only the least significant byte of each sample changes, and only its low bit
+    assert (samples[:, 1:] == stego[:, 1:]).all()
+    assert ((samples[:, 0] ^ stego[:, 0]) <= 1).all()
+    assert extract_from_audio(output) == "kept"
+
+
+def test_same_file_output_is_patched_in_place(tmp_path):
+    cover = write_wav(tmp_path / 'same.wav')
+    size = len(open(cover, 'rb').read())
+    hide_in_audio(cover, "same file", cover)
+    assert len(open(cover, 'rb').read()) == size
+    assert extract_from_audio(cover) == "same file"
+
+
+@pytest.mark.parametrize('width', [1, 2, 4])
+def test_file_objects_and_depths(tmp_path, width):
+    cover = io.BytesIO(open(write_wav(tmp_path / 'cover.wav', width=width), 'rb').read())
+    output = io.BytesIO()
+    hide_in_audio(cover, "objects", output, depth=3, password='pw')
+    output.seek(0)
+    assert extract_from_audio(output, password='pw') == "objects"
+    assert read_audio_payload(io.BytesIO(output.getvalue())).flags & 1
+
+
+def test_too_long_leaves_no_output(tmp_path):
+    cover = write_wav(tmp_path / 'short.wav', frames=100)
+    with pytest.raises(ValueError, match="too long"):
+        hide_in_audio(cover, "x" * 5000, str(tmp_path / 'out.wav'))
+    assert not (tmp_path / 'out.wav').exists()
@@ -0,0 +1,25 @@
+"""Covers opened once for detection and reveal."""
+
+import numpy as np
+from unittest import mock
+from . import cover as cover_module
+from .cover import OpenedCover
+from .vault import Vault
+
+
+def test_payload_is_decoded_once():
+    samples = np.random.default_rng(0).integers(0, 256, 50000, dtype=np.uint8)
+    stego = Vault(password="pw").hide(samples, "secret")
+    with mock.patch.object(cover_module, 'decode_payload', wraps=cover_module.decode_payload) as decode:
+        cover = OpenedCover(stego)
+        assert cover.found and cover.is_encrypted and cover.raw_message
+        assert decode.call_count == 1
+    assert cover.reveal("pw") == "secret"
+
+
+def test_scattered_payload_needs_the_password():
+    samples = np.random.default_rng(0).integers(0, 256, 50000, dtype=np.uint8)
+    cover = OpenedCover(Vault(password="pw", scatter=True).hide(samples, "scattered"))
+    assert not cover.found
+    assert cover.reveal("pw") == "scattered"
+    assert cover.found and cover.is_encrypted
@@ -0,0 +1,98 @@
+"""Round-trip checks of the payload, crypto, matrix, scatter and shard formats.
+
+Covers are NumPy sample arrays, so nothing touches the disk.
+"""
+
+import struct
+import numpy as np
+import pytest
+from .crypto import (KeySession, encrypt_bytes, decrypt_bytes, encrypt_message,
+                     MAX_KDF_COST, KDF_PBKDF2)
+from .payload import (HEADER_BITS, HEADER_SIZE, MAGIC, pack_header, parse_header,
+                      build_payload, samples_needed)
+from .bitcodec import extract_bytes
+from .shard import ShardHeader, pack_shard, parse_shard, is_shard
+from .vault import Vault
+
+
+def _cover(size=200000, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, size, dtype=np.uint8)
+
+
+def test_header_round_trip():
+    assert parse_header(pack_header(0x03, 1234, depth=2)) == (0x03, 2, 1234, 0)
+    assert parse_header(pack_header(0x01, 99, matrix=4)) == (0x01, 1, 99, 4)
+    # Headers written before the depth field existed hold zero there
+    assert parse_header(struct.pack(">4sBBBBI", MAGIC, 1, 0, 0, 0, 7)) == (0, 1, 7, 0)
+    assert parse_header(b"XXXX" + pack_header(0, 1)[4:]) is None
+    assert parse_header(struct.pack(">4sBBBBI", MAGIC, 2, 0, 1, 9, 7)) is None
+    assert parse_header(pack_header(0, 1)[:HEADER_SIZE - 1]) is None
+
+
+def test_crypto_formats():
+    blob = encrypt_bytes(b"secret", "hunter2")
+    assert decrypt_bytes(blob, "hunter2") == b"secret"
+    with pytest.raises(ValueError):
+        decrypt_bytes(blob, "wrong")
+
+    session = KeySession("hunter2", "pbkdf2", 1000)
+    first, second = session.encrypt(b"secret"), session.encrypt(b"secret")
+    assert first != second
+    assert decrypt_bytes(first, "hunter2") == b"secret"
+
+    # Blobs naming a KDF cost above the limit are refused before stretching
+    tampered = bytearray(first)
+    tampered[2:6] = struct.pack(">I", MAX_KDF_COST[KDF_PBKDF2] + 1)
+    with pytest.raises(ValueError):
+        decrypt_bytes(bytes(tampered), "hunter2")
+    with pytest.raises(ValueError):
+        KeySession("hunter2", "scrypt", 1000)
+
+    # Payloads written with the original Fernet format still decrypt
+    legacy = encrypt_message("old secret", "hunter2").encode('ascii')
+    assert decrypt_bytes(legacy, "hunter2") == b"old secret"
+
+
+def test_plain_and_password_round_trip():
+    cover = _cover()
+    for vault in (Vault(), Vault(password="hunter2"), Vault(depth=3)):
+        assert vault.extract(vault.hide(cover, "héllo wörld")) == "héllo wörld"
+        assert vault.extract_bytes(vault.hide(cover, b"\x00\xff" * 50)) == b"\x00\xff" * 50
+
+
+def test_matrix_embedding():
+    cover = _cover()
+    message = bytes(range(256)) * 8
+    for matrix in (2, 3, 5):
+        stego = Vault(matrix=matrix).hide(cover, message)
+        assert Vault().extract_bytes(stego) == message
+
+        # At most one sample changed per block of 2^p - 1 body samples
+        block = (1 << matrix) - 1
+        needed = samples_needed(len(build_payload(message, matrix=matrix)), 1, matrix)
+        changed = (stego != cover)[HEADER_BITS:needed]
+        assert changed.reshape(-1, block).sum(axis=1).max() <= 1
+
+    with pytest.raises(ValueError):
+        Vault(depth=2, matrix=3).hide(cover, message)
+
+
+def test_scatter_round_trip():
+    cover = _cover()
+    stego = Vault(password="hunter2", scatter=True).hide(cover, "scattered")
+    assert Vault(password="hunter2").extract(stego) == "scattered"
+    assert parse_header(extract_bytes(stego, HEADER_SIZE)) is None
+    assert Vault(password="wrong").extract(stego) is None
+
+
+def test_shard_format():
+    header = ShardHeader(b"\x01" * 16, 2, 5, 4096, 20000, b"\x02" * 32)
+    shard = pack_shard(header, b"slice of the payload")
+    assert is_shard(shard)
+    assert parse_shard(shard) == (header, b"slice of the payload")
+
+    corrupt = shard[:-1] + b"!"
+    with pytest.raises(ValueError):
+        parse_shard(corrupt)
+    with pytest.raises(ValueError):
+        parse_shard(b"not a shard")
@@ -0,0 +1,66 @@
+"""Animations and multi-page covers through steg.frames_steg."""
+
+import numpy as np
+import pytest
+from PIL import Image, ImageSequence
+from .image_steg import hide_in_image, extract_from_image
+from .frames_steg import hide_in_frames
+
+
+def _frames(count=4, size=(48, 40), mode='RGB', sizes=None):
+    rng = np.random.default_rng(0)
+    frames = []
+    for index in range(count):
+        width, height = sizes[index] if sizes else size
+        pixels = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        frames.append(Image.fromarray(pixels).convert(mode))
+    return frames
+
+
+def _save(path, frames, **options):
+    frames[0].save(path, save_all=True, append_images=frames[1:], **options)
+    return str(path)
+
+
+def test_gif_cover_becomes_apng(tmp_path):
+    cover = _save(tmp_path / 'cover.gif', _frames(mode='P'), duration=[40, 80, 120, 160], loop=0)
+    output = str(tmp_path / 'out.png')
+    # Hex text compresses back to about its bytes: just over two frames' worth
+    message = np.random.default_rng(1).bytes(48 * 40 * 3 * 2 // 8).hex()
+    hide_in_image(cover, message, output, verify=True)
+    assert extract_from_image(output) == message
+
+    animation = Image.open(output)
+    assert animation.format == 'PNG' and animation.n_frames == 4
+    assert animation.info.get('loop') == 0
+    assert [frame.info['duration'] for frame in ImageSequence.Iterator(animation)] == [40, 80, 120, 160]
+    # Frames past the payload keep their pixels
+    source = Image.open(cover)
+    source.seek(3)
+    animation.seek(3)
+    assert np.array_equal(np.asarray(source.convert('RGB')), np.asarray(animation.convert('RGB')))
+
+
+@pytest.mark.parametrize('output_name', ['out.tif', 'out.png'])
+def test_multi_page_tiff(tmp_path, output_name):
+    cover = _save(tmp_path / 'pages.tif', _frames(3))
+    output = str(tmp_path / output_name)
+    hide_in_image(cover, "paged", output, depth=2, verify=True)
+    assert extract_from_image(output) == "paged"
+    assert Image.open(output).n_frames == 3
+
+    hide_in_image(cover, "matrix", output, matrix=3)
+    assert extract_from_image(output) == "matrix"
+
+
+def test_refused_multi_frame_outputs(tmp_path):
+    cover = _save(tmp_path / 'pages.tif', _frames(2, sizes=[(48, 40), (32, 32)]))
+    with pytest.raises(ValueError, match='different sizes'):
+        hide_in_frames(cover, "message", str(tmp_path / 'out.png'))
+    hide_in_frames(cover, "message", str(tmp_path / 'out.tif'))
+    assert extract_from_image(str(tmp_path / 'out.tif')) == "message"
+
+    with pytest.raises(ValueError, match='different file'):
+        hide_in_frames(cover, "message", cover)
+    with pytest.raises(ValueError, match='Scattered'):
+        hide_in_frames(cover, "message", str(tmp_path / 'out.tif'), password='pw', scatter=True)
@@ -0,0 +1,69 @@
+"""File round trips through steg.image_steg."""
+
+import numpy as np
+import pytest
+from PIL import Image, ImageFile
+from .image_steg import hide_in_image, extract_from_image, read_image_prefix
+from .vault import Vault
+
+
+def _save(path, mode, size=(96, 80), **options):
+    pixels = np.random.default_rng(0).integers(0, 256, (size[1], size[0], len(mode)), dtype=np.uint8)
+    image = Image.fromarray(pixels[:, :, 0] if mode in ('L', 'P') else pixels, 'L' if mode == 'P' else None)
+    image.convert(mode).save(path, **options)
+    return str(path)
+
+
+@pytest.mark.parametrize('name, mode', [('raw.tif', 'L'), ('raw.tif', 'RGBA'), ('raw.tif', 'CMYK'),
+                                        ('cover.bmp', 'P'), ('cover.bmp', 'RGB')])
+def test_scatter_on_memory_mapped_covers(tmp_path, name, mode):
+    # Uncompressed TIFF and BMP pixels are mapped read-only straight from the file
+    cover = _save(tmp_path / name, mode)
+    output = str(tmp_path / ('out' + name[name.rindex('.'):]))
+    hide_in_image(cover, "scattered", output, password="pw", scatter=True)
+    assert extract_from_image(output, password="pw") == "scattered"
+
+
+def test_lossy_covers_are_not_decoded_for_probes(tmp_path, monkeypatch):
+    cover = _save(tmp_path / 'cover.jpg', 'RGB')
+    monkeypatch.setattr(ImageFile.ImageFile, 'load', lambda self: pytest.fail("decoded a JPEG"))
+    assert read_image_prefix(cover, 512).size == 0
+
+
+@pytest.mark.parametrize('name, options', [('cover.png', {}), ('raw.tif', {}),
+                                           ('lzw.tif', {'compression': 'tiff_lzw'}),
+                                           ('cover.bmp', {})])
+@pytest.mark.parametrize('embedding', [{'depth': 1}, {'depth': 3}, {'matrix': 3}])
+def test_row_strips_with_verify(tmp_path, name, options, embedding):
+    cover = _save(tmp_path / name, 'RGB', **options)
+    output = str(tmp_path / ('out' + name[name.rindex('.'):]))
+    message = np.random.default_rng(1).bytes(750).hex()
+    # Seven-row strips make the payload cross several bands
+    hide_in_image(cover, message, output, strip_rows=7, verify=True, **embedding)
+    assert extract_from_image(output, strip_rows=5) == message
+
+    # Rows past the payload are written back untouched
+    before, after = np.asarray(Image.open(cover)), np.asarray(Image.open(output))
+    assert np.array_equal(before[60:], after[60:])
+    assert not np.array_equal(before[:10], after[:10])
+
+
+def test_jpeg_cover_is_written_losslessly(tmp_path):
+    cover = _save(tmp_path / 'cover.jpg', 'RGB')
+    with pytest.raises(ValueError, match='re-encoding'):
+        hide_in_image(cover, "secret", str(tmp_path / 'out.jpg'))
+    hide_in_image(cover, "secret", str(tmp_path / 'out.png'), verify=True)
+    assert extract_from_image(str(tmp_path / 'out.png')) == "secret"
+
+
+def test_decompression_cap(tmp_path):
+    cover = _save(tmp_path / 'cover.png', 'RGB', size=(256, 256))
+    output = str(tmp_path / 'out.png')
+    # A highly compressible message fits in far fewer bytes than it expands to
+    message = "a" * 200000
+    Vault().hide(cover, message, out=output)
+    assert Vault().extract(output) == message
+    with pytest.raises(ValueError, match='exceeds the 100000 byte limit'):
+        Vault(max_size=100000).extract(output)
+    with pytest.raises(ValueError, match='exceeds'):
+        extract_from_image(output, max_size=199999)
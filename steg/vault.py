@@ -0,0 +1,198 @@
+import io
+import os
+import numpy as np
+from .bitcodec import embed_values, bytes_to_text, array_reader
+from .payload import build_payload, payload_symbols, decode_payload, decode_payload_bytes
+from .shard import is_shard
+from .scatter import permutation_for, embed_scattered, scatter_reader
+from .cover import BUFFER_TYPES, OpenedCover, cover_backend, cover_kind, read_cover_payload
+from .compression import MAX_MESSAGE_SIZE
+
+
+def _is_path(target):
+    return isinstance(target, (str, os.PathLike))
+
+
+def _deliver(data, out):
+    """Hand finished cover bytes to `out`: None, a path, a file object or a writable buffer."""
+    if out is None:
+        return data
+    if _is_path(out):
+        with open(out, 'wb') as f:
+            f.write(data)
+        return len(data)
+    if hasattr(out, 'write'):
+        out.write(data)
+        return len(data)
+    view = memoryview(out).cast('B')
+    if len(view) < len(data):
+        raise ValueError(f"Output buffer too small: {len(data)} bytes needed")
+    view[:len(data)] = data
+    return len(data)
+
+
+class Vault:
+    """Hide and extract messages in covers held in memory.
+
+    Covers may be file paths, bytes-like objects (bytes, bytearray,
+    memoryview), binary file objects or NumPy sample arrays; images and WAV
+    audio are told apart by their first bytes. Nothing is written to disk
+    unless `out` is a path. With `scatter`, payloads are spread over the
+    cover in an order keyed by the password; extraction finds them either way.
+    `channels` restricts audio covers to those channels, for hiding and
+    extracting alike. A nonzero `matrix` hides bodies with a Hamming code
+    of that parameter p: p bits per block of 2^p - 1 samples, at most one
+    of them changed; extraction reads the mode from the header. Each
+    format's backend module is imported only once a cover needs it.
+    """
+
+    def __init__(self, password=None, depth=1, max_size=MAX_MESSAGE_SIZE,
+                 strip_rows=None, block_frames=None, scatter=False, encoder=None, verify=False,
+                 channels=None, matrix=0):
+        if scatter and not password:
+            raise ValueError("Scattered embedding needs a password")
+        self.password = password
+        self.depth = depth
+        self.scatter = scatter
+        self.max_size = max_size
+        self.strip_rows = strip_rows
+        self.block_frames = block_frames
+        self.encoder = encoder
+        self.verify = verify
+        self.channels = channels
+        self.matrix = matrix
+
+    def hide(self, cover, message, out=None, format=None, inplace=False):
+        """Hide `message`, text or bytes, in `cover` and return the new cover.
+
+        Returns the cover bytes when `out` is None. Otherwise the result is
+        written to `out` (a path, binary file object or writable buffer)
+        and its length in bytes is returned. Array covers give back an
+        array: a modified copy, or `out` itself when it is an array (pass
+        the cover as `out` to embed in place). `format` picks the image
+        encoder for non-path outputs; `inplace` patches WAV files on disk.
+        """
+        kind = cover_kind(cover)
+        if kind == 'array':
+            return self._hide_array(cover, message, out)
+
+        backend = cover_backend(cover, kind)
+        options = self._options(kind)
+        if kind == 'image':
+            source = io.BytesIO(cover) if isinstance(cover, BUFFER_TYPES) else cover
+            if _is_path(out):
+                backend.hide(source, message, out, self.password, depth=self.depth, format=format,
+                             scatter=self.scatter, matrix=self.matrix, **options,
+                             **self._encoder_options())
+                return os.path.getsize(out)
+            encoded = io.BytesIO()
+            backend.hide(source, message, encoded, self.password, depth=self.depth, format=format,
+                         scatter=self.scatter, matrix=self.matrix, **options,
+                         **self._encoder_options())
+            return _deliver(encoded.getvalue(), out)
+
+        if _is_path(out) and (_is_path(cover) or not (inplace or self.scatter)):
+            # Stream frames from file to file, or patch a copy on disk
+            if not _is_path(cover):
+                cover.seek(0)
+            backend.hide(cover, message, out, self.password, inplace=inplace,
+                         depth=self.depth, scatter=self.scatter, matrix=self.matrix, **options)
+            return os.path.getsize(out)
+        if inplace:
+            raise ValueError("In-place embedding needs input and output file paths")
+
+        # WAV files are patched as a whole image rather than re-encoded
+        if isinstance(out, BUFFER_TYPES) and not hasattr(out, 'write'):
+            data = self._read_all(cover)
+            _deliver(data, out)
+            backend.hide_buffer(out, message, self.password, self.depth, self.scatter,
+                                self.channels, self.matrix)
+            return len(data)
+        patched = bytearray(self._read_all(cover))
+        backend.hide_buffer(patched, message, self.password, self.depth, self.scatter,
+                            self.channels, self.matrix)
+        return _deliver(bytes(patched), out)
+
+    def extract(self, cover):
+        """Return the message hidden in `cover` as text, or None.
+
+        Shards of a split payload are not text and raise ValueError.
+        """
+        payload = self.read_payload(cover)
+        data = decode_payload_bytes(payload, self.password, self.max_size)
+        if data is None:
+            # Encrypted payloads read without a password come back as base64 text
+            return None if self.password else decode_payload(payload, max_size=self.max_size)
+        if is_shard(data):
+            raise ValueError("The cover holds a shard of a split payload; extract it with --set")
+        return bytes_to_text(data) or None
+
+    def extract_bytes(self, cover):
+        """Return the message bytes hidden in `cover`, or None."""
+        return decode_payload_bytes(self.read_payload(cover), self.password, self.max_size)
+
+    def read_payload(self, cover):
+        """Read the raw payload of `cover` without decrypting it."""
+        kind = cover_kind(cover)
+        if kind != 'array' and not isinstance(cover, BUFFER_TYPES):
+            return cover_backend(cover, kind).read_payload(cover, password=self.password,
+                                                           **self._options(kind))
+        if kind == 'audio' and self.channels is not None:
+            return cover_backend(cover, kind).read_buffer(cover, self.password, self.channels)
+        return read_cover_payload(cover, self.password)
+
+    def open(self, cover):
+        """Decode `cover` once into an OpenedCover."""
+        return OpenedCover(cover, self.max_size)
+
+    def _options(self, kind):
+        """Format options for the backend; unset ones keep its defaults."""
+        if kind == 'image':
+            options = {'strip_rows': self.strip_rows}
+        else:
+            options = {'block_frames': self.block_frames, 'channels': self.channels}
+        return {name: value for name, value in options.items() if value is not None}
+
+    def _encoder_options(self):
+        """Encoder profile and verification for image outputs."""
+        options = {'verify': self.verify}
+        if self.encoder:
+            options['profile'] = self.encoder
+        return options
+
+    def _read_all(self, cover):
+        """The whole cover as a bytes-like object, without copying buffers."""
+        if isinstance(cover, BUFFER_TYPES):
+            return cover
+        if _is_path(cover):
+            with open(cover, 'rb') as f:
+                return f.read()
+        cover.seek(0)
+        return cover.read()
+
+    def _hide_array(self, cover, message, out):
+        """Embed into the flattened samples of an integer array."""
+        if cover.dtype.kind not in 'iu':
+            raise ValueError("Array covers must hold integer samples")
+        if not 1 <= self.depth <= min(8, cover.dtype.itemsize * 8):
+            raise ValueError("Bits per sample out of range for the array type")
+
+        if out is None:
+            target = cover.copy()
+        else:
+            target = out
+            if target is not cover:
+                np.copyto(target, cover)
+        samples = target.reshape(-1)
+        if not np.shares_memory(samples, target):
+            raise ValueError("Output array must be contiguous")
+
+        data = build_payload(message, self.password, self.depth, self.matrix)
+        if self.scatter:
+            permutation = permutation_for(self.password, samples.size)
+            values, masks = payload_symbols(data, self.depth, scatter_reader(samples, permutation))
+            embed_scattered(samples, values, masks, permutation)
+        else:
+            values, masks = payload_symbols(data, self.depth, array_reader(samples))
+            embed_values(samples, values, masks)
+        return target
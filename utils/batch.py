@@ -0,0 +1,214 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from steg.backends import lossless_output
+from steg.vault import Vault
+from steg.crypto import KeySession, KDF_NAMES, DEFAULT_KDF_COST, check_kdf_cost
+from steg.payload import payload_size
+from utils.validator import validate_file, check_capacity
+
+
+def resolve_password(ref):
+    """Resolve a password reference: env:NAME, file:PATH or pass:VALUE."""
+    if not ref:
+        return None
+    kind, _, value = ref.partition(':')
+    if kind == 'env':
+        if value not in os.environ:
+            raise ValueError(f"Environment variable {value} is not set")
+        return os.environ[value]
+    if kind == 'file':
+        with open(value, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    if kind == 'pass':
+        return value
+    raise ValueError(f"Unknown password reference: {ref}")
+
+
+def _manifest_rows(path):
+    """Yield the rows of a JSONL or CSV manifest as dicts.
+
+    A JSONL line that is not a JSON object is yielded as a ValueError
+    saying so, which fails that job alone.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            yield from csv.DictReader(f)
+        else:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield ValueError(f"Manifest line {number} is not valid JSON: {e}")
+                    continue
+                if not isinstance(row, dict):
+                    row = ValueError(f"Manifest line {number} is not a JSON object")
+                yield row
+
+
+def load_jobs(source, action='hide', message=None, message_file=None,
+              output_dir=None, password_ref=None, depth=1):
+    """Build the job list from a cover directory or a JSONL/CSV manifest.
+
+    Manifest rows hold cover, message or message_file, output and
+    password_ref columns, plus optional action and bits_per_sample
+    columns. Directory jobs share the
+    message and password reference given here and write into `output_dir`.
+    Rows that can't be parsed become jobs carrying an `error`, which
+    run_job reports as that job's failure. Lossy hide outputs are renamed
+    to their lossless extension here, and a job whose output another job
+    already writes gets an error too, so no two workers write one file.
+    """
+    if os.path.isdir(source):
+        rows = []
+        for name in sorted(os.listdir(source)):
+            cover = os.path.join(source, name)
+            if not os.path.isfile(cover) or not validate_file(cover):
+                continue
+            output = os.path.join(output_dir, name) if output_dir else None
+            if output and action == 'extract':
+                # a.png and a.wav must not both write a.txt
+                output += '.txt'
+            rows.append({'cover': cover, 'message': message,
+                         'message_file': message_file, 'output': output,
+                         'password_ref': password_ref})
+    else:
+        rows = list(_manifest_rows(source))
+
+    jobs = []
+    for index, row in enumerate(rows):
+        try:
+            if isinstance(row, ValueError):
+                raise row
+            job = {
+                'index': index,
+                'action': row.get('action') or action,
+                'cover': row.get('cover'),
+                'message': row.get('message') or None,
+                'message_file': row.get('message_file') or None,
+                'output': row.get('output') or None,
+                'password_ref': row.get('password_ref') or password_ref,
+                'depth': _row_depth(row, depth),
+            }
+        except ValueError as e:
+            fields = row if isinstance(row, dict) else {}
+            job = {'index': index, 'action': action, 'cover': fields.get('cover'),
+                   'output': fields.get('output') or None, 'password_ref': None, 'error': str(e)}
+        jobs.append(job)
+    _claim_outputs(jobs)
+    return jobs
+
+
+def _claim_outputs(jobs):
+    """Give each output path to its first job; later jobs writing it fail."""
+    owners = {}
+    for job in jobs:
+        if not job['output'] or job.get('error'):
+            continue
+        # Lossy outputs would lose the payload, so they are written as PNG
+        if job['action'] == 'hide':
+            job['output'] = lossless_output(job['output'])
+        key = os.path.normcase(os.path.abspath(job['output']))
+        if key in owners:
+            job['error'] = f"Output {job['output']} is already written by job {owners[key]}"
+        else:
+            owners[key] = job['index']
+
+
+def _row_depth(row, default):
+    """The bits_per_sample column of a manifest row, or `default` when empty."""
+    value = row.get('bits_per_sample') or default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"bits_per_sample must be an integer, not {value!r}")
+
+
+def open_sessions(jobs, kdf='pbkdf2', cost=None):
+    """Stretch each distinct password of the hide jobs once into a KeySession.
+
+    Workers then derive per-file keys with HKDF instead of running the KDF
+    for every cover. References that fail to resolve are left for the
+    worker to report; an unknown KDF or a cost it can't take raises here.
+    """
+    if kdf not in KDF_NAMES:
+        raise ValueError(f"Unknown key derivation function: {kdf}")
+    check_kdf_cost(KDF_NAMES[kdf], cost or DEFAULT_KDF_COST[KDF_NAMES[kdf]])
+
+    sessions = {}
+    for job in jobs:
+        ref = job['password_ref']
+        if job['action'] != 'hide' or not ref:
+            continue
+        if ref not in sessions:
+            try:
+                password = resolve_password(ref)
+            except (ValueError, OSError):
+                sessions[ref] = None
+            else:
+                sessions[ref] = KeySession(password, kdf, cost)
+        job['key_session'] = sessions[ref]
+
+
+def run_job(job):
+    """Run one hide or extract job and report its outcome; never raises."""
+    result = {'index': job['index'], 'action': job['action'], 'cover': job['cover'],
+              'output': job['output']}
+    start = time.perf_counter()
+    try:
+        if job.get('error'):
+            raise ValueError(job['error'])
+        cover = job['cover']
+        if not cover or not validate_file(cover):
+            raise ValueError(f"Invalid or unsupported file: {cover}")
+        password = job.get('key_session') or resolve_password(job['password_ref'])
+
+        if job['action'] == 'hide':
+            message = job['message']
+            if job['message_file']:
+                with open(job['message_file'], 'r', encoding='utf-8') as f:
+                    message = f.read()
+            if message is None:
+                raise ValueError("No message given")
+            if not job['output']:
+                raise ValueError("No output path given")
+            if not check_capacity(cover, message, password, job['depth']):
+                raise ValueError("Message too long for the cover file")
+
+            Vault(password, job['depth']).hide(cover, message, out=job['output'])
+            result['bytes'] = payload_size(message, password)
+
+        elif job['action'] == 'extract':
+            message = Vault(password).extract(cover)
+            if message is None:
+                raise ValueError("No hidden message found or incorrect password")
+
+            if job['output']:
+                with open(job['output'], 'w', encoding='utf-8') as f:
+                    f.write(message)
+            else:
+                result['message'] = message
+            result['bytes'] = len(message.encode('utf-8'))
+
+        else:
+            raise ValueError(f"Unknown action: {job['action']}")
+
+        result['status'] = 'ok'
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+
+    result['seconds'] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def run_batch(jobs, workers=None):
+    """Run jobs over a process pool, yielding each result as it completes."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_job, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,127 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from steg.backends import backend_for
+from steg.payload import payload_capacity
+from utils.scanner import iter_covers
+from utils.validator import cover_info
+
+# Index file created inside the indexed directory by default
+DEFAULT_INDEX = '.ghostvault-index.db'
+
+_COLUMNS = ['path', 'mtime', 'size', 'media', 'format', 'width', 'height', 'bands',
+            'frames', 'channels', 'sample_width', 'samples']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS covers (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    media TEXT NOT NULL,
+    format TEXT,
+    width INTEGER,
+    height INTEGER,
+    bands INTEGER,
+    frames INTEGER,
+    channels INTEGER,
+    sample_width INTEGER,
+    samples INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS capacities (
+    path TEXT NOT NULL REFERENCES covers(path) ON DELETE CASCADE,
+    depth INTEGER NOT NULL,
+    capacity INTEGER NOT NULL,
+    PRIMARY KEY (path, depth)
+);
+CREATE INDEX IF NOT EXISTS capacities_fit ON capacities (depth, capacity);
+"""
+
+
+class CoverIndex:
+    """SQLite index of cover files, their geometry and capacity at each depth.
+
+    Files are only re-read when their mtime or size changed since the last
+    update, and best_fit() answers from the index without opening covers.
+    """
+
+    def __init__(self, db_path):
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self.db.close()
+
+    def update(self, root, workers=None):
+        """Bring the entries under `root` up to date; returns counts per outcome."""
+        root = os.path.abspath(root)
+        known = {path: (mtime, size) for path, mtime, size in
+                 self.db.execute("SELECT path, mtime, size FROM covers")
+                 if path == root or path.startswith(root + os.sep)}
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'unreadable': 0}
+
+        seen = set()
+        stale = []
+        for path in iter_covers([root]):
+            path = os.path.abspath(path)
+            if path.endswith(DEFAULT_INDEX):
+                continue
+            stat = os.stat(path)
+            seen.add(path)
+            if known.get(path) == (stat.st_mtime, stat.st_size):
+                counts['unchanged'] += 1
+            else:
+                stale.append((path, stat))
+
+        # Header reads are I/O bound, so probe changed files on threads
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            infos = list(pool.map(lambda item: cover_info(item[0]), stale))
+
+        with self.db:
+            for (path, stat), info in zip(stale, infos):
+                self.db.execute("DELETE FROM covers WHERE path = ?", (path,))
+                if info is None:
+                    counts['unreadable'] += 1
+                    continue
+                counts['updated' if path in known else 'added'] += 1
+                row = dict(info, path=path, mtime=stat.st_mtime, size=stat.st_size)
+                self.db.execute(f"INSERT INTO covers ({', '.join(_COLUMNS)}) "
+                                f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                                [row.get(column) for column in _COLUMNS])
+                self.db.executemany(
+                    "INSERT INTO capacities (path, depth, capacity) VALUES (?, ?, ?)",
+                    [(path, depth, payload_capacity(info['samples'], depth))
+                     for depth in range(1, backend_for(path).max_depth + 1)])
+
+            for path in set(known) - seen:
+                self.db.execute("DELETE FROM covers WHERE path = ?", (path,))
+                counts['removed'] += 1
+        return counts
+
+    def best_fit(self, size, depth=1, media=None):
+        """Path of the smallest indexed cover holding a `size`-byte payload, or None.
+
+        Covers changed on disk since they were indexed are passed over.
+        """
+        query = ("SELECT c.path, c.mtime, c.size FROM capacities AS k "
+                 "JOIN covers AS c ON c.path = k.path "
+                 "WHERE k.depth = ? AND k.capacity >= ?")
+        params = [depth, size]
+        if media:
+            query += " AND c.media = ?"
+            params.append(media)
+        for path, mtime, file_size in self.db.execute(query + " ORDER BY k.capacity, c.path", params):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if (stat.st_mtime, stat.st_size) == (mtime, file_size):
+                return path
+        return None
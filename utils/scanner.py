@@ -0,0 +1,63 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from steg.backends import extensions
+from steg.cover import cover_kind, probe_cover
+from steg.compression import CODEC_NAMES
+from steg.payload import FLAG_ENCRYPTED, PROBE_SAMPLES
+
+
+def iter_covers(paths):
+    """Yield every supported cover under the given files and directories."""
+    supported = tuple(extensions())
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(supported):
+                    yield os.path.join(root, name)
+
+
+def scan_file(path, samples=PROBE_SAMPLES, analyze=False, sample_fraction=None):
+    """Probe one cover and describe its payload; never raises.
+
+    With `analyze`, the cover's samples also go through the statistical
+    attacks of steg.analysis, over `sample_fraction` of its blocks if given.
+    """
+    result = {'path': path}
+    try:
+        result['media'] = cover_kind(path)
+        probe = probe_cover(path, samples)
+        if probe is None:
+            result['payload'] = None
+        else:
+            codec = CODEC_NAMES.get(probe.flags & ~FLAG_ENCRYPTED)
+            result.update({
+                'payload': probe.kind,
+                'length': probe.length,
+                'encrypted': bool(probe.flags & FLAG_ENCRYPTED),
+                'compressed': codec,
+                'bits_per_sample': probe.depth,
+                'matrix': probe.matrix or None,
+            })
+        if analyze:
+            # Steganalysis decodes whole covers; only load it when asked for
+            from steg.analysis import analyze_cover
+            result['analysis'] = analyze_cover(path, sample_fraction)
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def scan_tree(paths, workers=None, samples=PROBE_SAMPLES, analyze=False, sample_fraction=None):
+    """Scan covers with a thread pool, yielding results in walk order.
+
+    Header probes are dominated by opening and reading files, so threads
+    overlap the I/O without the cost of worker processes.
+    """
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(lambda path: scan_file(path, samples, analyze, sample_fraction),
+                            iter_covers(paths))
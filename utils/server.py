@@ -0,0 +1,299 @@
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs, unquote
+from steg.backends import backends, extensions, find_backend, lossless_output
+from steg.cover import cover_kind
+from steg.vault import Vault
+
+# Largest request body accepted by default
+MAX_BODY = 256 * 1024 * 1024
+
+# Bytes written per step when streaming a response
+WRITE_CHUNK = 64 * 1024
+
+# Seconds spent draining a rejected request before the connection is closed
+LINGER_SECONDS = 2
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 431: 'Request Header Fields Too Large',
+            500: 'Internal Server Error',
+            503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    """An error answered with an HTTP status and a JSON body."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _warm():
+    """Run once in each worker so the pool is forked and imported up front.
+
+    Backends are registered lazily, so every backend module (PIL, wave)
+    and the crypto module are imported here rather than on a first request.
+    """
+    for backend in backends():
+        backend.load()
+    import steg.crypto
+    return os.getpid()
+
+
+def _hide_job(cover, message, password, depth, ext):
+    """Hide a message in cover bytes and return the resulting file bytes.
+
+    Image outputs are encoded in the format of `ext`, or PNG for lossy ones.
+    """
+    format = None
+    if find_backend('cover' + ext).media == 'image':
+        from PIL import Image
+        format = Image.registered_extensions()[lossless_output('cover' + ext)[len('cover'):]]
+    return Vault(password, depth).hide(cover, message, format=format)
+
+
+def _extract_job(cover, password):
+    """Extract the message from cover bytes, or None."""
+    return Vault(password).extract(cover)
+
+
+def _int_param(query, name, default):
+    """An integer query parameter; anything else is a 400."""
+    try:
+        return int(query.get(name, default))
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer")
+
+
+def _split_message(query, headers, body):
+    """Return (message, cover) from a /hide request body and headers."""
+    if 'message_length' in query:
+        length = _int_param(query, 'message_length', 0)
+        if not 0 <= length <= len(body):
+            raise HTTPError(400, "message_length is larger than the request body")
+        try:
+            return body[:length].decode('utf-8'), body[length:]
+        except UnicodeDecodeError:
+            raise HTTPError(400, "The message is not valid UTF-8")
+    if 'x-ghostvault-message' in headers:
+        return unquote(headers['x-ghostvault-message']), body
+    raise HTTPError(400, "Missing message: pass message_length or an X-GhostVault-Message header")
+
+
+class StegServer:
+    """HTTP/1.1 front end that runs hide/extract jobs on a warm process pool.
+
+    POST /hide?format=png and POST /extract?format=wav take the raw cover
+    as the request body; `format` names the cover's format and that of the
+    new cover (lossy image formats come back as PNG). The message goes in
+    the body too: with message_length=N the body starts with N bytes of
+    UTF-8 message text, followed by the cover. Short messages may instead
+    be sent percent-encoded in the X-GhostVault-Message header, and the
+    password in X-GhostVault-Password. /hide also accepts bits_per_sample.
+    /hide answers with the new cover, /extract with {"message": ...}.
+    At most `workers + queue_size` requests are admitted at once, and
+    further ones get 503 before their body is read. Only `workers` bodies
+    are read at a time, so uploads don't pile up in memory faster than
+    the pool can take them.
+    """
+
+    def __init__(self, workers=None, queue_size=64, max_body=MAX_BODY):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_body = max_body
+        self.pool = None
+        self.slots = asyncio.Semaphore(self.workers + queue_size)
+        self.reading = asyncio.Semaphore(self.workers)
+
+    async def start_pool(self):
+        """Fork every worker and import the backends before serving."""
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.pool, _warm)
+                               for _ in range(self.workers)])
+
+    def close(self):
+        if self.pool:
+            # Queued jobs can only be cancelled from Python 3.9
+            if sys.version_info >= (3, 9):
+                self.pool.shutdown(cancel_futures=True)
+            else:
+                self.pool.shutdown()
+
+    async def _read_body(self, reader, headers):
+        """Read the request body, chunked or sized, within the size limit."""
+        body = bytearray()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                line = await reader.readline()
+                try:
+                    size = int(line.split(b';')[0].strip() or b'0', 16)
+                except ValueError:
+                    raise HTTPError(400, "Malformed chunk size")
+                if size == 0:
+                    await reader.readline()
+                    break
+                if len(body) + size > self.max_body:
+                    raise HTTPError(413, "Request body too large")
+                body += await reader.readexactly(size)
+                await reader.readline()
+        else:
+            try:
+                length = int(headers.get('content-length', '0'))
+            except ValueError:
+                raise HTTPError(400, "Malformed Content-Length")
+            if length > self.max_body:
+                raise HTTPError(413, "Request body too large")
+            while len(body) < length:
+                chunk = await reader.read(min(WRITE_CHUNK, length - len(body)))
+                if not chunk:
+                    raise HTTPError(400, "Request body ended early")
+                body += chunk
+        return bytes(body)
+
+    async def _send(self, writer, status, body, content_type='application/json', keep_alive=True):
+        """Write a response, draining between chunks so slow clients push back."""
+        head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+        view = memoryview(body)
+        for start in range(0, len(view), WRITE_CHUNK):
+            writer.write(view[start:start + WRITE_CHUNK])
+            await writer.drain()
+        await writer.drain()
+
+    async def _linger(self, reader, writer):
+        """Half-close and drop what the client is still sending.
+
+        Closing with unread data makes the kernel reset the connection,
+        which can discard the response before the client reads it.
+        """
+        async def drain():
+            while await reader.read(WRITE_CHUNK):
+                pass
+
+        writer.write_eof()
+        try:
+            await asyncio.wait_for(drain(), LINGER_SECONDS)
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+
+    async def _dispatch(self, method, target, headers, body):
+        """Run one request and return (status, body, content type)."""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if url.path == '/health':
+            return 200, json.dumps({'status': 'ok', 'workers': self.workers}).encode(), 'application/json'
+        if url.path not in ('/hide', '/extract'):
+            raise HTTPError(404, f"Unknown endpoint: {url.path}")
+        if method != 'POST':
+            raise HTTPError(405, "Use POST")
+
+        ext = '.' + query.get('format', '').lower().lstrip('.')
+        if ext not in extensions():
+            raise HTTPError(400, f"Unsupported format: {query.get('format')}")
+        password = unquote(headers.get('x-ghostvault-password', '')) or None
+        if url.path == '/hide':
+            message, body = _split_message(query, headers, body)
+            depth = _int_param(query, 'bits_per_sample', 1)
+        if cover_kind(body) != find_backend('cover' + ext).media:
+            raise HTTPError(400, f"The request body is not a {ext[1:]} cover")
+
+        loop = asyncio.get_running_loop()
+        if url.path == '/hide':
+            try:
+                output = await loop.run_in_executor(self.pool, _hide_job, body, message,
+                                                    password, depth, ext)
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+            return 200, output, 'application/octet-stream'
+
+        message = await loop.run_in_executor(self.pool, _extract_job, body, password)
+        if message is None:
+            raise HTTPError(404, "No hidden message found or incorrect password")
+        return 200, json.dumps({'message': message}).encode(), 'application/json'
+
+    async def handle(self, reader, writer):
+        """Serve requests on one connection until the client closes it."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.LimitOverrunError:
+                    # Oversized headers can't be skipped reliably, so answer and hang up
+                    await self._send(writer, 431, b'{"error": "Request headers too large; '
+                                     b'send the message in the body with message_length"}',
+                                     keep_alive=False)
+                    await self._linger(reader, writer)
+                    break
+                except asyncio.IncompleteReadError:
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    await self._send(writer, 400, b'{"error": "Malformed request line"}', keep_alive=False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        key, _, value = line.partition(':')
+                        headers[key.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                # Reject instead of queueing without bound, before taking the upload
+                if self.slots.locked():
+                    await self._send(writer, 503, b'{"error": "Server busy, retry later"}',
+                                     keep_alive=False)
+                    await self._linger(reader, writer)
+                    break
+                async with self.slots:
+                    try:
+                        async with self.reading:
+                            body = await self._read_body(reader, headers)
+                    except HTTPError as e:
+                        # The rest of the body is unread, so the connection can't be reused
+                        await self._send(writer, e.status, json.dumps({'error': str(e)}).encode(),
+                                         keep_alive=False)
+                        await self._linger(reader, writer)
+                        break
+                    try:
+                        status, payload, content_type = await self._dispatch(method, target, headers, body)
+                    except HTTPError as e:
+                        status, payload, content_type = e.status, json.dumps({'error': str(e)}).encode(), 'application/json'
+                    except Exception as e:
+                        status, payload, content_type = 500, json.dumps({'error': str(e)}).encode(), 'application/json'
+                await self._send(writer, status, payload, content_type, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=8765, socket_path=None, workers=None,
+                queue_size=64, max_body=MAX_BODY, ready=None):
+    """Run the server until cancelled, on a Unix socket or a TCP address."""
+    server = StegServer(workers, queue_size, max_body)
+    await server.start_pool()
+    try:
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            listener = await asyncio.start_unix_server(server.handle, path=socket_path)
+        else:
+            listener = await asyncio.start_server(server.handle, host, port)
+        if ready:
+            ready(listener)
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
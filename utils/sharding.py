@@ -0,0 +1,192 @@
+import hashlib
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from steg.backends import backend_for, lossless_output
+from steg.compression import MAX_MESSAGE_SIZE
+from steg.crypto import KeySession, encryption_overhead
+from steg.payload import HEADER_BITS
+from steg.shard import SHARD_HEADER_SIZE, ShardHeader, is_shard, pack_shard, parse_shard
+from steg.vault import Vault
+from utils.validator import validate_file, cover_samples
+
+# Bytes read per step when hashing a payload
+HASH_CHUNK = 1 << 20
+
+
+def cover_depth(cover, depth):
+    """Bits per sample used on a cover: `depth`, capped at what its backend embeds."""
+    return min(depth, backend_for(cover).max_depth)
+
+
+def shard_capacity(cover, password=None, depth=1):
+    """Bytes of a split payload one cover can carry at up to `depth` bits per sample."""
+    depth = cover_depth(cover, depth)
+    samples = cover_samples(cover)
+    if samples <= HEADER_BITS:
+        return 0
+    # Header at one bit per sample, then the encrypted shard at `depth`
+    body = (samples - HEADER_BITS) * depth // 8
+    if password:
+        body -= encryption_overhead(password)
+    return max(0, body - SHARD_HEADER_SIZE)
+
+
+def file_digest(path):
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def plan_shards(total_size, covers, password=None, depth=1):
+    """Cut a payload of `total_size` bytes into consecutive slices, largest cover first.
+
+    Returns [(cover, offset, length)]. Messages are stored uncompressed
+    when compression does not help, so planning on raw sizes is safe, but
+    it also means covers must hold the whole file uncompressed even when
+    it would compress well; compress such files before splitting them.
+    `depth` is a ceiling, lowered per cover to its backend's MAX_DEPTH.
+    """
+    capacities = sorted(((shard_capacity(cover, password, depth), cover) for cover in covers),
+                        key=lambda item: -item[0])
+    plan = []
+    offset = 0
+    for capacity, cover in capacities:
+        if plan and offset >= total_size:
+            break
+        if capacity <= 0:
+            continue
+        length = min(capacity, total_size - offset)
+        plan.append((cover, offset, length))
+        offset += length
+    if offset < total_size or not plan:
+        raise ValueError(f"Covers too small: {total_size - offset} more bytes needed")
+    return plan
+
+
+def split_jobs(source, covers, output_dir, password=None, depth=1, scatter=False):
+    """Plan the shard jobs that split the file `source` across `covers`.
+
+    The password is stretched once into a KeySession shared by every shard.
+    Outputs keep the cover file names inside `output_dir`.
+    """
+    covers = [cover for cover in covers if validate_file(cover)]
+    # JPEG covers are written as PNG, which must not clash with other names
+    names = [lossless_output(os.path.basename(cover)) for cover in covers]
+    if len(set(names)) != len(names):
+        raise ValueError("Covers must have distinct file names")
+    outputs = dict(zip(covers, names))
+
+    session = KeySession(password) if password else None
+    total_size = os.path.getsize(source)
+    plan = plan_shards(total_size, covers, session, depth)
+    set_id = uuid.uuid4().bytes
+    digest = file_digest(source)
+
+    jobs = []
+    for index, (cover, offset, length) in enumerate(plan):
+        jobs.append({
+            'index': index,
+            'cover': cover,
+            'output': os.path.join(output_dir, outputs[cover]),
+            'source': source,
+            'header': ShardHeader(set_id, index, len(plan), offset, total_size, digest),
+            'length': length,
+            'password': session,
+            'depth': cover_depth(cover, depth),
+            'scatter': scatter,
+        })
+    return jobs
+
+
+def embed_shard(job):
+    """Embed one slice of the source file into its cover; never raises."""
+    result = {'index': job['index'], 'cover': job['cover'], 'output': job['output'],
+              'set_id': job['header'].set_id.hex(), 'bytes': job['length']}
+    start = time.perf_counter()
+    try:
+        with open(job['source'], 'rb') as f:
+            f.seek(job['header'].offset)
+            data = f.read(job['length'])
+        vault = Vault(job['password'], job['depth'], scatter=job['scatter'])
+        vault.hide(job['cover'], pack_shard(job['header'], data), out=job['output'])
+        result['status'] = 'ok'
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    result['seconds'] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def run_split(jobs, workers=None):
+    """Embed shards over a process pool, yielding each result in shard order."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(embed_shard, jobs)
+
+
+def _extract_shard(job):
+    """Extract one cover's shard and write it at its offset in the output."""
+    result = {'cover': job['cover']}
+    try:
+        vault = Vault(job['password'], max_size=job['max_size'])
+        data = vault.extract_bytes(job['cover'])
+        if not data or not is_shard(data):
+            result['status'] = 'skipped'
+            return result
+        header, chunk = parse_shard(data)
+        if job['set_id'] and header.set_id != job['set_id']:
+            result['status'] = 'skipped'
+            return result
+        with open(job['output'], 'r+b') as f:
+            f.seek(header.offset)
+            f.write(chunk)
+        result.update(status='ok', header=header, bytes=len(chunk))
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    return result
+
+
+def join_shards(covers, output, password=None, workers=None, max_size=MAX_MESSAGE_SIZE,
+                set_id=None):
+    """Reassemble a split payload from covers given in any order.
+
+    Each worker writes its shard straight to its offset in `output`, so no
+    process holds more than one shard. The result is then checked against
+    the set's shard count, size and SHA-256, and removed if it fails.
+    """
+    with open(output, 'wb'):
+        pass
+    jobs = [{'cover': cover, 'output': output, 'password': password,
+             'max_size': max_size, 'set_id': set_id} for cover in covers]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_extract_shard, jobs))
+
+    try:
+        headers = [result['header'] for result in results if result['status'] == 'ok']
+        errors = [f"{result['cover']}: {result['error']}" for result in results
+                  if result['status'] == 'error']
+        if not headers:
+            raise ValueError("No shards found" + (f" ({errors[0]})" if errors else ""))
+        if len({header.set_id for header in headers}) > 1:
+            raise ValueError("Covers hold shards of several sets; pick one with a set id")
+
+        first = headers[0]
+        missing = sorted(set(range(first.count)) - {header.index for header in headers})
+        if missing:
+            raise ValueError(f"Missing shards {missing} of {first.count}"
+                             + (f"; {'; '.join(errors)}" if errors else ""))
+
+        os.truncate(output, first.total_size)
+        if file_digest(output) != first.digest:
+            raise ValueError("Reassembled payload failed its SHA-256 check")
+    except ValueError:
+        os.remove(output)
+        raise
+
+    return {'set_id': first.set_id.hex(), 'shards': first.count,
+            'bytes': first.total_size, 'skipped': sum(result['status'] == 'skipped' for result in results)}
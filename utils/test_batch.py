@@ -0,0 +1,63 @@
+"""Batch jobs from directories and manifests, run in-process."""
+
+import json
+import os
+import numpy as np
+from PIL import Image
+from .batch import load_jobs, run_job
+
+
+def _image(path, seed=0):
+    pixels = np.random.default_rng(seed).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(path)
+    return path
+
+
+def test_lossy_and_lossless_covers_do_not_share_an_output(tmp_path):
+    covers = tmp_path / 'covers'
+    covers.mkdir()
+    _image(str(covers / 'x.jpg'))
+    _image(str(covers / 'x.png'), 1)
+    out = str(tmp_path / 'out')
+    os.makedirs(out)
+
+    jobs = load_jobs(str(covers), 'hide', message='secret', output_dir=out)
+    results = sorted((run_job(job) for job in jobs), key=lambda result: result['index'])
+    # x.jpg comes first and is written as x.png, so x.png itself is refused
+    assert [result['status'] for result in results] == ['ok', 'error']
+    assert results[0]['output'] == os.path.join(out, 'x.png')
+    assert 'already written by job 0' in results[1]['error']
+
+
+def test_malformed_manifest_rows_fail_alone(tmp_path):
+    cover = _image(str(tmp_path / 'cover.png'))
+    rows = [json.dumps({'cover': cover, 'message': 'one', 'output': str(tmp_path / 'a.png')}),
+            '{bad json',
+            json.dumps({'cover': cover, 'message': 'x', 'output': str(tmp_path / 'b.png'),
+                        'bits_per_sample': 'two'}),
+            json.dumps({'cover': cover, 'message': 'one', 'output': str(tmp_path / 'a.png')})]
+    manifest = tmp_path / 'jobs.jsonl'
+    manifest.write_text('\n'.join(rows) + '\n')
+
+    results = [run_job(job) for job in load_jobs(str(manifest))]
+    assert [result['status'] for result in results] == ['ok', 'error', 'error', 'error']
+
+    extract = {'index': 0, 'action': 'extract', 'cover': str(tmp_path / 'a.png'),
+               'output': None, 'password_ref': None}
+    assert run_job(extract)['message'] == 'one'
+
+
+def test_directory_extracts_keep_the_cover_extension(tmp_path):
+    covers = tmp_path / 'covers'
+    covers.mkdir()
+    out = tmp_path / 'out'
+    out.mkdir()
+    for name, seed in (('a.png', 0), ('a.bmp', 1)):
+        run_job({'index': 0, 'action': 'hide', 'cover': _image(str(tmp_path / name), seed),
+                 'message': name, 'message_file': None, 'output': str(covers / name),
+                 'password_ref': None, 'depth': 1})
+
+    results = [run_job(job) for job in load_jobs(str(covers), 'extract', output_dir=str(out))]
+    assert [result['status'] for result in results] == ['ok', 'ok']
+    assert (out / 'a.png.txt').read_text() == 'a.png'
+    assert (out / 'a.bmp.txt').read_text() == 'a.bmp'
@@ -0,0 +1,44 @@
+"""The SQLite cover index: refreshes and best-fit lookups."""
+
+import os
+import numpy as np
+from PIL import Image
+from steg.test_audio_steg import write_wav
+from .cover_index import CoverIndex
+from .validator import cover_capacity
+
+
+def _image(path, size):
+    pixels = np.random.default_rng(0).integers(0, 256, (size, size, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(str(path))
+    return str(path)
+
+
+def test_update_and_best_fit(tmp_path):
+    covers = tmp_path / 'covers'
+    covers.mkdir()
+    small = _image(covers / 'small.png', 32)
+    large = _image(covers / 'large.png', 96)
+    audio = write_wav(covers / 'clip.wav', frames=20000)
+    (covers / 'notes.txt').write_text("not a cover")
+
+    with CoverIndex(str(tmp_path / 'index.db')) as index:
+        assert index.update(str(covers)) == {'added': 3, 'updated': 0, 'unchanged': 0,
+                                             'removed': 0, 'unreadable': 0}
+        assert index.update(str(covers))['unchanged'] == 3
+
+        assert index.best_fit(100) == os.path.abspath(small)
+        assert index.best_fit(cover_capacity(small) + 1, media='image') == os.path.abspath(large)
+        assert index.best_fit(cover_capacity(large) + 1, media='image') is None
+        assert index.best_fit(cover_capacity(large) + 1) == os.path.abspath(audio)
+        # Images stop at four bits per sample, so only the WAV is indexed at eight
+        assert index.best_fit(100, depth=8) == os.path.abspath(audio)
+
+        # A cover changed since indexing is passed over until the next update
+        _image(covers / 'small.png', 40)
+        os.utime(small, (1, 1))
+        assert index.best_fit(100) == os.path.abspath(large)
+        os.remove(audio)
+        counts = index.update(str(covers))
+        assert (counts['updated'], counts['removed']) == (1, 1)
+        assert index.best_fit(100) == os.path.abspath(small)
@@ -0,0 +1,40 @@
+"""Header triage of cover trees with utils.scanner."""
+
+import os
+import numpy as np
+from PIL import Image
+from steg.test_audio_steg import write_wav
+from steg.vault import Vault
+from .scanner import scan_tree
+
+
+def test_scan_tree(tmp_path):
+    covers = tmp_path / 'covers'
+    (covers / 'nested').mkdir(parents=True)
+    pixels = np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(str(covers / 'clean.png'))
+    Vault().hide(str(covers / 'clean.png'), "plain " * 50, out=str(covers / 'plain.png'))
+    audio = write_wav(covers / 'nested' / 'clip.wav')
+    Vault(password='pw', depth=2).hide(audio, "secret", out=str(covers / 'nested' / 'locked.wav'))
+    Image.fromarray(pixels).save(str(covers / 'photo.jpg'))
+    (covers / 'broken.png').write_bytes(b'not an image')
+
+    results = {os.path.relpath(result['path'], str(covers)): result
+               for result in scan_tree([str(covers)], workers=4)}
+    assert sorted(results) == ['broken.png', 'clean.png', os.path.join('nested', 'clip.wav'),
+                               os.path.join('nested', 'locked.wav'), 'photo.jpg', 'plain.png']
+
+    assert results['clean.png']['payload'] is None
+    assert results['photo.jpg']['payload'] is None
+    assert 'error' in results['broken.png']
+    plain = results['plain.png']
+    assert (plain['payload'], plain['encrypted'], plain['compressed']) == ('header', False, 'zlib')
+    locked = results[os.path.join('nested', 'locked.wav')]
+    assert (locked['media'], locked['encrypted'], locked['bits_per_sample']) == ('audio', True, 2)
+
+
+def test_scan_with_analysis(tmp_path):
+    audio = write_wav(tmp_path / 'wide.wav')
+    result = next(scan_tree([audio], analyze=True))
+    # Attacks only hold for 8-bit samples; wider ones get no estimate
+    assert result['analysis']['sample_bits'] == 16 and result['analysis']['suspect'] is None
@@ -0,0 +1,95 @@
+"""The hide/extract HTTP server, driven over a real socket."""
+
+import asyncio
+import io
+import json
+import numpy as np
+from PIL import Image
+from .server import serve
+
+
+def _png():
+    pixels = np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    encoded = io.BytesIO()
+    Image.fromarray(pixels).save(encoded, format='PNG')
+    return encoded.getvalue()
+
+
+async def _request(port, head, body=b''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status, _, payload = response.partition(b'\r\n\r\n')
+    return int(status.split()[1]), payload
+
+
+def _post(target, body, extra=''):
+    return (f"POST {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: close\r\n{extra}\r\n")
+
+
+def _run(scenario, **options):
+    async def main():
+        ready = asyncio.get_running_loop().create_future()
+        server = asyncio.ensure_future(serve(port=0, ready=ready.set_result, **options))
+        listener = await ready
+        try:
+            return await scenario(listener.sockets[0].getsockname()[1])
+        finally:
+            server.cancel()
+    return asyncio.run(main())
+
+
+def test_round_trip_with_message_in_body():
+    cover = _png()
+    message = 'é' * 12000
+
+    async def scenario(port):
+        data = message.encode('utf-8')
+        target = f'/hide?format=png&message_length={len(data)}'
+        status, stego = await _request(port, _post(target, data + cover), data + cover)
+        assert status == 200 and stego.startswith(b'\x89PNG')
+        status, found = await _request(port, _post('/extract?format=png', stego), stego)
+        assert status == 200 and json.loads(found)['message'] == message
+
+        # The same message as a header is too large: 431, not a reset
+        head = _post('/hide?format=png', cover, f"X-GhostVault-Message: {'%C3%A9' * 12000}\r\n")
+        status, _ = await _request(port, head, cover)
+        assert status == 431
+
+    _run(scenario, workers=1)
+
+
+def test_bad_parameters_are_client_errors():
+    cover = _png()
+
+    async def scenario(port):
+        status, _ = await _request(port, _post('/hide?format=png&bits_per_sample=two&message_length=2',
+                                               b'hi' + cover), b'hi' + cover)
+        assert status == 400
+        status, _ = await _request(port, _post('/hide?format=wav&message_length=2', b'hi' + cover),
+                                   b'hi' + cover)
+        assert status == 400
+        chunked = ("POST /extract?format=png HTTP/1.1\r\nTransfer-Encoding: chunked\r\n"
+                   "Connection: close\r\n\r\nzz\r\n")
+        status, _ = await _request(port, chunked)
+        assert status == 400
+
+    _run(scenario, workers=1)
+
+
+def test_busy_server_refuses_before_the_upload():
+    async def scenario(port):
+        # Hold the only slot with a request whose body never arrives
+        _, stalled = await asyncio.open_connection('127.0.0.1', port)
+        stalled.write(_post('/extract?format=png', b'x' * 1000).encode('latin-1'))
+        await stalled.drain()
+        await asyncio.sleep(0.2)
+
+        status, _ = await _request(port, _post('/extract?format=png', b'x' * 1000))
+        stalled.close()
+        return status
+
+    assert _run(scenario, workers=1, queue_size=0) == 503
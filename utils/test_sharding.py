@@ -0,0 +1,75 @@
+"""Split payloads across image and WAV covers, then join them back."""
+
+import os
+import json
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from PIL import Image
+from steg.test_audio_steg import write_wav
+from .sharding import plan_shards, shard_capacity, split_jobs, run_split, join_shards
+
+
+def _covers(directory):
+    directory.mkdir()
+    pixels = np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(str(directory / 'a.png'))
+    return [str(directory / 'a.png'), write_wav(directory / 'b.wav', frames=3000)]
+
+
+def test_split_and_join_across_media(tmp_path):
+    covers = _covers(tmp_path / 'covers')
+    payload = np.random.default_rng(1).bytes(8000)
+    source = tmp_path / 'payload.bin'
+    source.write_bytes(payload)
+
+    # Eight bits per sample exceeds the image backend's limit, so the PNG gets four
+    assert shard_capacity(covers[0], depth=8) == shard_capacity(covers[0], depth=4)
+    jobs = split_jobs(str(source), covers, str(tmp_path / 'shards'), password='pw', depth=8)
+    assert {os.path.basename(job['cover']): job['depth'] for job in jobs} == {'a.png': 4, 'b.wav': 8}
+
+    os.makedirs(str(tmp_path / 'shards'))
+    assert [result['status'] for result in run_split(jobs, workers=2)] == ['ok', 'ok']
+    shards = [job['output'] for job in jobs]
+    summary = join_shards(shards[::-1], str(tmp_path / 'joined.bin'), password='pw', workers=2)
+    assert summary['shards'] == 2 and summary['bytes'] == len(payload)
+    assert (tmp_path / 'joined.bin').read_bytes() == payload
+
+    # A missing shard leaves no partial output behind
+    with pytest.raises(ValueError, match='Missing shards'):
+        join_shards(shards[:1], str(tmp_path / 'partial.bin'), password='pw')
+    assert not (tmp_path / 'partial.bin').exists()
+
+
+def test_plan_is_refused_when_covers_are_too_small(tmp_path):
+    covers = _covers(tmp_path / 'covers')
+    total = sum(shard_capacity(cover) for cover in covers)
+    assert sum(length for _, _, length in plan_shards(total, covers)) == total
+    with pytest.raises(ValueError, match='Covers too small'):
+        plan_shards(total + 1, covers)
+
+
+def test_split_and_extract_set_commands(tmp_path):
+    from ghostvault_cli import cli
+
+    covers = _covers(tmp_path / 'covers')
+    source = tmp_path / 'notes.bin'
+    source.write_bytes(np.random.default_rng(2).bytes(3000))
+    shards = str(tmp_path / 'shards')
+    runner = CliRunner()
+
+    result = runner.invoke(cli, ['split', str(source), str(tmp_path / 'covers'), '-o', shards,
+                                 '-p', 'pw', '-b', '2', '-w', '2'])
+    lines = [json.loads(line) for line in result.stdout.splitlines() if line.startswith('{')]
+    assert [line['status'] for line in lines] == ['ok', 'ok']
+    assert sorted(os.listdir(shards)) == ['a.png', 'b.wav']
+
+    joined = str(tmp_path / 'joined.bin')
+    result = runner.invoke(cli, ['extract', '--set', shards, '-p', 'pw', '-o', joined,
+                                 '--set-id', lines[0]['set_id']])
+    assert 'Reassembled 3000 bytes from 2 shards' in result.output
+    assert open(joined, 'rb').read() == source.read_bytes()
+
+    result = runner.invoke(cli, ['extract', '--set', shards, '-p', 'pw', '-o', joined,
+                                 '--set-id', '00' * 16])
+    assert 'No shards found' in result.output and not os.path.exists(joined)
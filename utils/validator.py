@@ -1,34 +1,51 @@
 import os
-from PIL import Image
-import wave
+from steg.backends import find_backend
+from steg.payload import payload_capacity, payload_size
 
 def validate_file(file_path):
     """Validate if file exists and is supported format."""
     if not os.path.exists(file_path):
         return False
     
-    ext = os.path.splitext(file_path)[1].lower()
-    supported_formats = ['.png', '.jpg', '.jpeg', '.wav']
-    
-    return ext in supported_formats
+    return find_backend(file_path) is not None
 
-def check_capacity(file_path, message):
-    """Check if file can hold the message."""
-    ext = os.path.splitext(file_path)[1].lower()
-    message_bits = len(message + "###END###") * 8
-    
+def cover_info(file_path):
+    """Describe a cover from its header: format, geometry and embeddable samples.
+
+    Returns None when the file can't be read as a supported cover.
+    """
+    backend = find_backend(file_path)
+    if backend is None:
+        return None
     try:
-        if ext in ['.png', '.jpg', '.jpeg']:
-            img = Image.open(file_path)
-            total_pixels = img.width * img.height * len(img.getbands())
-            return message_bits <= total_pixels
-        
-        elif ext == '.wav':
-            with wave.open(file_path, 'rb') as audio:
-                frames = audio.getnframes()
-                return message_bits <= frames
-        
+        return backend.probe(file_path)
     except Exception:
-        return False
-    
-    return False
\ No newline at end of file
+        return None
+
+def cover_samples(file_path):
+    """Number of samples a cover offers for embedding, or 0 if it can't be read."""
+    info = cover_info(file_path)
+    return info['samples'] if info else 0
+
+def cover_capacity(file_path, depth=1, channels=None, matrix=0):
+    """Largest payload in bytes, header included, a cover holds in one embedding mode.
+
+    The mode is `depth` bits per sample, or a Hamming code with parameter
+    `matrix` at one bit per sample. `channels` limits an audio cover to the
+    samples of those channels. Returns 0 if the cover can't be read.
+    """
+    info = cover_info(file_path)
+    if not info:
+        return 0
+    samples = info['samples']
+    if channels is not None and info['media'] == 'audio':
+        samples = info['frames'] * len(set(channels))
+    return payload_capacity(samples, depth, matrix)
+
+def check_capacity(file_path, message, password=None, depth=1, channels=None, matrix=0):
+    """Check if file can hold the message at `depth` bits per sample.
+
+    `channels` limits an audio cover to the samples of those channels and
+    a nonzero `matrix` checks against the capacity of that Hamming code.
+    """
+    return payload_size(message, password) <= cover_capacity(file_path, depth, channels, matrix)